@@ -1,18 +1,191 @@
 import asyncio
+import functools
+import inspect
 import logging
+from collections import OrderedDict
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
-import os
 import time
+from pathlib import Path
+from urllib.parse import urlparse
+from ..config import CONFIG
 
 logger = logging.getLogger(__name__)
 
+LOCATOR_CACHE_SIZE = 256
+BROWSER_POOL_SIZE = CONFIG.browser_pool_size
+BROWSER_POOL_RECYCLE_AFTER = CONFIG.browser_pool_recycle_after
+
+SCREENSHOT_DIR = Path("screenshots")
+
+SCROLL_DIRECTIONS = {
+    "up": (0, -1),
+    "down": (0, 1),
+    "left": (-1, 0),
+    "right": (1, 0)
+}
+
+DESCRIPTION_SELECTOR_TEMPLATES = (
+    "text={}",
+    "[aria-label*='{}']",
+    "[title*='{}']",
+    "[placeholder*='{}']"
+)
+
+DOM_VERSION_INIT_JS = """(() => {
+    window.__webmcpDocId = Math.random().toString(36).slice(2);
+    window.__webmcpDomVersion = 0;
+    new MutationObserver(() => { window.__webmcpDomVersion++; }).observe(document, {
+        subtree: true, childList: true, characterData: true, attributes: true
+    });
+})();"""
+DOM_FINGERPRINT_JS = """() => window.__webmcpDocId === undefined
+    ? null : window.__webmcpDocId + ':' + window.__webmcpDomVersion"""
+
+ATTRIBUTES_JS = """(el, attributes) => Object.fromEntries(attributes.map(
+    (name) => [name, name.toLowerCase() === 'innertext' ? el.textContent : el.getAttribute(name)]))"""
+
+CONSENT_ACCEPT_TEXTS = ["accept", "accept all", "i accept", "ok", "got it"]
+CONSENT_REJECT_TEXTS = ["reject", "decline"]
+CONSENT_MARKER = "data-webmcp-consent"
+CONSENT_JS = """([acceptTexts, rejectTexts]) => {
+    const visible = (el) => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+    const buttons = Array.from(document.querySelectorAll('button')).filter(visible);
+    const byText = (text) => buttons.find((b) => (b.innerText || '').toLowerCase().includes(text));
+    const match = acceptTexts.map(byText).find(Boolean)
+        || buttons.find((b) => String(b.id).includes('accept') || String(b.className).includes('accept'))
+        || Array.from(document.querySelectorAll('#L2AGLb')).find(visible)
+        || rejectTexts.map(byText).find(Boolean);
+    if (!match) return null;
+    match.setAttribute('""" + CONSENT_MARKER + """', '');
+    return (match.innerText || match.id || match.tagName).trim();
+}"""
+
+@functools.lru_cache(maxsize=None)
+def _screenshot_dir() -> Path:
+    SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    return SCREENSHOT_DIR
+
+def playwright_op(action: str, timeout_message: str = None, mutates: bool = False):
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                result = await fn(self, *args, **kwargs)
+            except Exception as e:
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                fields = {**bound.arguments, "error": e}
+                if isinstance(e, PlaywrightTimeoutError):
+                    message = (timeout_message or "Timeout while trying to " + action).format(**fields)
+                else:
+                    message = f"Failed to {action.format(**fields)}: {e}"
+                logger.error("%s", message)
+                return {"status": "error", "message": message}
+            if mutates:
+                self._dom_hash = await self._dom_fingerprint()
+            return {"status": "success", **(result or {})}
+        return wrapper
+    return decorator
+
+_playwright = None
+_playwright_lock = asyncio.Lock()
+
+async def get_playwright():
+    global _playwright
+    async with _playwright_lock:
+        if _playwright is None:
+            logger.info("Starting Playwright engine...")
+            _playwright = await async_playwright().start()
+            logger.info("Playwright engine started successfully")
+    return _playwright
+
+async def stop_playwright():
+    global _playwright
+    async with _playwright_lock:
+        if _playwright is not None:
+            try:
+                await _playwright.stop()
+            except Exception as e:
+                logger.warning("Error stopping playwright (might be already stopped): %s", e)
+            _playwright = None
+
+class BrowserPool:
+    def __init__(self, size: int = BROWSER_POOL_SIZE, recycle_after: int = BROWSER_POOL_RECYCLE_AFTER):
+        self.size = size
+        self.recycle_after = recycle_after
+        self._idle = {}
+        self._uses = {}
+
+    async def _launch(self, headless: bool) -> Browser:
+        playwright = await get_playwright()
+        logger.info("Launching browser with headless=%s...", headless)
+        browser = await playwright.chromium.launch(headless=headless)
+        self._uses[browser] = 0
+        logger.info("Browser launched successfully")
+        return browser
+
+    async def acquire(self, headless: bool = True) -> Browser:
+        idle = self._idle.setdefault(headless, [])
+        while idle:
+            browser = idle.pop()
+            if browser.is_connected():
+                logger.info("Reusing pooled browser")
+                self._uses[browser] += 1
+                return browser
+            self._uses.pop(browser, None)
+        
+        browser = await self._launch(headless)
+        self._uses[browser] += 1
+        return browser
+
+    async def release(self, browser: Browser, headless: bool = True):
+        idle = self._idle.setdefault(headless, [])
+        uses = self._uses.get(browser, 0)
+        
+        if browser.is_connected() and uses < self.recycle_after and len(idle) < self.size:
+            idle.append(browser)
+            return
+        
+        self._uses.pop(browser, None)
+        try:
+            logger.info("Closing pooled browser after %s uses", uses)
+            await browser.close()
+        except Exception as e:
+            logger.warning("Error closing pooled browser (might be already closed): %s", e)
+
+    async def warm_up(self, headless: bool = True):
+        idle = self._idle.setdefault(headless, [])
+        if len(idle) >= self.size or any(browser.is_connected() for browser in idle):
+            return
+        idle.append(await self._launch(headless))
+
+    async def shutdown(self):
+        for idle in self._idle.values():
+            for browser in idle:
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.warning("Error closing pooled browser (might be already closed): %s", e)
+            idle.clear()
+        self._uses.clear()
+        await stop_playwright()
+
+browser_pool = BrowserPool()
+
 class BrowserAutomation:
     def __init__(self, headless: bool = True):
         self.headless = headless
-        self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self._locator_cache = OrderedDict()
+        self._text_cache = {}
+        self._consent_done = set()
+        self._dom_hash = None
+        self._visible_cache = {}
+        self._known_good_selectors = set()
 
     async def __aenter__(self):
         await self.start()
@@ -22,393 +195,325 @@ class BrowserAutomation:
         await self.close()
 
     async def start(self):
-        logger.info("Starting Playwright engine...")
-        self.playwright = await async_playwright().start()
-        logger.info("Playwright engine started successfully")
-        
-        logger.info(f"Launching browser with headless={self.headless}...")
-        self.browser = await self.playwright.chromium.launch(headless=self.headless)
-        logger.info("Browser launched successfully")
+        self.browser = await browser_pool.acquire(self.headless)
         
         logger.info("Creating browser context...")
         self.context = await self.browser.new_context(
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         )
+        await self.context.add_init_script(DOM_VERSION_INIT_JS)
         logger.info("Browser context created successfully")
         
         logger.info("Creating new page...")
         self.page = await self.context.new_page()
+        self.page.on("framenavigated", self._on_frame_navigated)
         
         self.page.set_default_timeout(30000)
         self.page.set_default_navigation_timeout(60000)
         
         logger.info("Browser initialization complete")
 
+    def _loc(self, selector: str):
+        key = (id(self.page), selector)
+        locator = self._locator_cache.get(key)
+        if locator is None:
+            locator = self.page.locator(selector).first
+            self._locator_cache[key] = locator
+            if len(self._locator_cache) > LOCATOR_CACHE_SIZE:
+                self._locator_cache.popitem(last=False)
+        else:
+            self._locator_cache.move_to_end(key)
+        return locator
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self._dom_hash = None
+            self._visible_cache.clear()
+
+    async def _dom_fingerprint(self):
+        try:
+            return await self.page.evaluate(DOM_FINGERPRINT_JS)
+        except Exception as e:
+            logger.debug("Could not read DOM fingerprint: %s", e)
+            return None
+
     async def handle_consent_popup(self):
-        logger.info("Checking for consent popups with quick timeout...")
+        origin = urlparse(self.page.url).netloc
+        if origin in self._consent_done:
+            logger.info("Consent already handled for %s, skipping popup check", origin)
+            return
         
-        consent_selectors = [
-            'button:has-text("Accept")',
-            'button:has-text("Accept All")',
-            'button:has-text("I Accept")',
-            'button:has-text("OK")',
-            'button:has-text("Got it")',
-            'button[id*="accept"]',
-            'button[class*="accept"]',
-            '#L2AGLb', 
-            'button:has-text("Reject")',
-            'button:has-text("Decline")',
-        ]
+        logger.info("Checking for consent popups with quick timeout...")
         
-        found_popup = False
         try:
-            for selector in consent_selectors:
-                try:
-                    element = self.page.locator(selector).first
-                    await element.wait_for(state="visible", timeout=2000)
-                    await element.click()
-                    logger.info(f"Clicked consent popup: {selector}")
-                    found_popup = True
-                    break
-                except PlaywrightTimeoutError:
-                    continue
-                except Exception as e:
-                    logger.debug(f"Error with selector {selector}: {str(e)}")
-                    continue
-            
-            if not found_popup:
-                logger.info("No consent popups detected or none were clickable.")
-            
-            if found_popup:
-                await asyncio.sleep(1)
-                
+            handle = await self.page.wait_for_function(
+                CONSENT_JS, arg=[CONSENT_ACCEPT_TEXTS, CONSENT_REJECT_TEXTS], timeout=2000, polling=100
+            )
+            label = await handle.json_value()
+            consent_button = self.page.locator(f"[{CONSENT_MARKER}]").first
+            await consent_button.click()
+            logger.info("Clicked consent popup: %s", label)
+            self._consent_done.add(origin)
+            try:
+                await consent_button.wait_for(state="hidden", timeout=1500)
+            except PlaywrightTimeoutError:
+                logger.debug("Consent button still visible after click, continuing")
+        except PlaywrightTimeoutError:
+            logger.info("No consent popups detected or none were clickable.")
+            self._consent_done.add(origin)
         except Exception as e:
-            logger.warning(f"Error during consent popup handling: {str(e)}")
+            logger.warning("Error during consent popup handling: %s", e)
 
     async def close(self):
         logger.info("Closing browser resources...")
         
         try:
-            if self.page:
-                await self.page.close()
-        except Exception as e:
-            logger.warning(f"Error closing page (might be already closed): {e}")
-        
-        try:
-            if self.context:
+            if self.context and self.browser and self.browser.is_connected():
                 await self.context.close()
         except Exception as e:
-            logger.warning(f"Error closing context (might be already closed or closing): {e}")
-        
-        try:
-            if self.browser:
-                await self.browser.close()
-        except Exception as e:
-            logger.warning(f"Error closing browser (might be already closed): {e}")
+            logger.warning("Error closing context (might be already closed or closing): %s", e)
         
-        try:
-            if self.playwright:
-                await self.playwright.stop()
-        except Exception as e:
-            logger.warning(f"Error stopping playwright (might be already stopped): {e}")
+        if self.browser:
+            await browser_pool.release(self.browser, self.headless)
         
+        self.page = None
+        self.context = None
+        self.browser = None
+        self._locator_cache.clear()
+        self._text_cache.clear()
+        self._consent_done.clear()
+        self._dom_hash = None
+        self._visible_cache.clear()
+        self._known_good_selectors.clear()
         logger.info("Browser resources closed.")
 
-    async def navigate(self, url: str, wait_until: str = 'domcontentloaded'):
+    async def _wait_for_network_idle(self, timeout_ms: int = 10000):
         try:
-            logger.info(f"Navigating to {url} (wait_until='{wait_until}')...")
-            response = await self.page.goto(url, wait_until=wait_until, timeout=30000)
-            
-            if response:
-                status = response.status
-                logger.info(f"Navigation to {url} completed with status: {status}")
-            else:
-                logger.warning(f"Navigation to {url} completed but no response object")
-                status = 200
-            
+            await self.page.wait_for_load_state('networkidle', timeout=timeout_ms)
+            logger.info("Network became idle after navigation.")
+        except PlaywrightTimeoutError:
+            logger.info("Network didn't become idle within timeout, but continuing...")
+
+    async def wait_for_dom_ready(self, timeout_ms: int = 1000):
+        try:
+            await self.page.wait_for_load_state('domcontentloaded', timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            logger.debug("DOM not ready within %sms, continuing", timeout_ms)
+
+    @playwright_op("navigate to {url}", timeout_message="Navigation timeout: {error}", mutates=True)
+    async def navigate(self, url: str, wait_until: str = 'domcontentloaded', wait_for_idle: bool = False):
+        logger.info("Navigating to %s (wait_until='%s')...", url, wait_until)
+        response = await self.page.goto(url, wait_until=wait_until, timeout=30000)
+        self._locator_cache.clear()
+        self._text_cache.clear()
+        self._visible_cache.clear()
+        
+        if response:
+            status = response.status
+            logger.info("Navigation to %s completed with status: %s", url, status)
+        else:
+            logger.warning("Navigation to %s completed but no response object", url)
+            status = 200
+        
+        if wait_for_idle:
+            await asyncio.gather(self.handle_consent_popup(), self._wait_for_network_idle())
+        else:
             await self.handle_consent_popup()
-            
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=10000)
-                logger.info("Network became idle after navigation and consent handling.")
-            except PlaywrightTimeoutError:
-                logger.info("Network didn't become idle within timeout, but continuing...")
-            
-            return {
-                "status": "success",
-                "message": "Navigation successful",
-                "url": self.page.url,
-                "http_status": status
-            }
         
-        except PlaywrightTimeoutError as e:
-            logger.error(f"Navigation timeout to {url}: {str(e)}")
-            return {"status": "error", "message": f"Navigation timeout: {str(e)}"}
-        except Exception as e:
-            logger.error(f"Navigation error to {url}: {str(e)}")
-            return {"status": "error", "message": f"Navigation failed: {str(e)}"}
+        return {"message": "Navigation successful", "url": self.page.url, "http_status": status}
+
+    async def navigate_many(self, urls: list, concurrency: int = 8):
+        logger.info("Navigating to %s URLs with concurrency=%s...", len(urls), concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def visit(url: str):
+            async with semaphore:
+                page = await self.context.new_page()
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                    return {
+                        "status": "success",
+                        "url": page.url,
+                        "http_status": response.status if response else None
+                    }
+                except PlaywrightTimeoutError as e:
+                    logger.error("Navigation timeout to %s: %s", url, e)
+                    return {"status": "error", "url": url, "message": f"Navigation timeout: {str(e)}"}
+                except Exception as e:
+                    logger.error("Navigation error to %s: %s", url, e)
+                    return {"status": "error", "url": url, "message": f"Navigation failed: {str(e)}"}
+                finally:
+                    await page.close()
+        
+        results = await asyncio.gather(*(visit(url) for url in urls))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Bulk navigation finished: %s/%s succeeded", sum(r['status'] == 'success' for r in results), len(urls))
+        return results
+
+    async def _click_fast(self, selector: str):
+        await self.page.click(selector, timeout=10000)
+        self._known_good_selectors.add(selector)
+        logger.info("Successfully clicked element: %s", selector)
+        return {"message": f"Clicked element '{selector}'"}
 
+    @playwright_op("click element '{selector}'", timeout_message="Timeout waiting for element '{selector}' to be visible", mutates=True)
     async def click_element(self, selector: str):
-        try:
-            logger.info(f"Attempting to click element with selector: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.click()
-            logger.info(f"Successfully clicked element: {selector}")
-            return {"status": "success", "message": f"Clicked element '{selector}'"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element to be visible: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for element '{selector}' to be visible"}
-        except Exception as e:
-            logger.error(f"Error clicking element {selector}: {str(e)}")
-            return {"status": "error", "message": f"Failed to click element '{selector}': {str(e)}"}
+        if selector in self._known_good_selectors:
+            return await self._click_fast(selector)
+        await self._loc(selector).click(timeout=10000)
+        self._known_good_selectors.add(selector)
+        logger.info("Successfully clicked element: %s", selector)
+        return {"message": f"Clicked element '{selector}'"}
 
+    @playwright_op("click element '{selector}'", timeout_message="Timeout waiting for element '{selector}' to be visible", mutates=True)
+    async def click_selector_fast(self, selector: str):
+        return await self._click_fast(selector)
+
+    @playwright_op("type into element '{selector}'", timeout_message="Timeout waiting for element '{selector}' to be visible", mutates=True)
     async def type_into_element(self, selector: str, text: str):
-        try:
-            logger.info(f"Attempting to type '{text}' into element with selector: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.clear()
-            await element.fill(text)
-            logger.info(f"Typed '{text}' into element: {selector}")
-            return {"status": "success", "message": f"Typed '{text}' into element '{selector}'."}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element to be visible: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for element '{selector}' to be visible"}
-        except Exception as e:
-            logger.error(f"Error typing into element {selector}: {str(e)}")
-            return {"status": "error", "message": f"Failed to type into element '{selector}': {str(e)}"}
+        await self._loc(selector).fill(text, timeout=10000)
+        logger.info("Typed '%s' into element: %s", text, selector)
+        return {"message": f"Typed '{text}' into element '{selector}'."}
 
+    @playwright_op("press key '{key}'", timeout_message="Timeout waiting for element '{selector}'", mutates=True)
     async def press_key(self, key: str, selector: str = None):
-        try:
-            if selector:
-                logger.info(f"Pressing key '{key}' on element with selector: {selector}")
-                element = self.page.locator(selector).first
-                await element.wait_for(state="visible", timeout=10000)
-                await element.press(key)
-                logger.info(f"Pressed key '{key}' on element: {selector}")
-            else:
-                logger.info(f"Pressing key '{key}' on page")
-                await self.page.keyboard.press(key)
-                logger.info(f"Pressed key '{key}' on page")
-            
-            return {"status": "success", "message": f"Pressed key '{key}'" + (f" on element '{selector}'" if selector else "")}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for element '{selector}'"}
-        except Exception as e:
-            logger.error(f"Error pressing key {key}: {str(e)}")
-            return {"status": "error", "message": f"Failed to press key '{key}': {str(e)}"}
+        if selector:
+            await self._loc(selector).press(key, timeout=10000)
+            logger.info("Pressed key '%s' on element: %s", key, selector)
+            return {"message": f"Pressed key '{key}' on element '{selector}'"}
+        
+        await self.page.keyboard.press(key)
+        logger.info("Pressed key '%s' on page", key)
+        return {"message": f"Pressed key '{key}'"}
 
+    @playwright_op("wait for element '{selector}'", timeout_message="Timeout waiting for element '{selector}' to be {state}")
     async def wait_for_element(self, selector: str, timeout_ms: int = 10000, state: str = "visible"):
-        try:
-            logger.info(f"Waiting for element '{selector}' to be {state} (timeout: {timeout_ms}ms)")
-            element = self.page.locator(selector).first
-            await element.wait_for(state=state, timeout=timeout_ms)
-            logger.info(f"Element '{selector}' is now {state}")
-            return {"status": "success", "message": f"Element '{selector}' is {state}"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element '{selector}' to be {state}")
-            return {"status": "error", "message": f"Timeout waiting for element '{selector}' to be {state}"}
-        except Exception as e:
-            logger.error(f"Error waiting for element {selector}: {str(e)}")
-            return {"status": "error", "message": f"Failed to wait for element '{selector}': {str(e)}"}
+        gated = state == "visible" and self._dom_hash is not None
+        if gated and self._visible_cache.get(selector) == self._dom_hash:
+            logger.info("Element '%s' already seen %s and DOM unchanged, skipping wait", selector, state)
+            return {"message": f"Element '{selector}' is {state}"}
+        
+        logger.info("Waiting for element '%s' to be %s (timeout: %sms)", selector, state, timeout_ms)
+        await self._loc(selector).wait_for(state=state, timeout=timeout_ms)
+        logger.info("Element '%s' is now %s", selector, state)
+        if gated:
+            self._visible_cache[selector] = self._dom_hash
+        return {"message": f"Element '{selector}' is {state}"}
 
+    @playwright_op("get text content", timeout_message="Timeout getting text content (selector: {selector})")
     async def get_page_text_content(self, selector: str = None):
-        try:
-            if selector:
-                logger.info(f"Attempting to get text content from selector: {selector}")
-                element = self.page.locator(selector).first
-                await element.wait_for(state="visible", timeout=10000)
-                text_content = await element.text_content()
-            else:
-                logger.info("Getting text content from entire page")
-                text_content = await self.page.text_content('body')
-            
-            if text_content:
-                logger.info(f"Retrieved text content: {len(text_content)} characters")
-                return {
-                    "status": "success",
-                    "result": {"text_content": text_content.strip()}
-                }
-            else:
-                logger.warning("No text content found")
-                return {"status": "error", "message": "No text content found"}
-                
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout getting text content from: {selector if selector else 'page'}")
-            return {"status": "error", "message": f"Timeout getting text content from: {selector if selector else 'page'}"}
-        except Exception as e:
-            logger.error(f"Error getting text content: {str(e)}")
-            return {"status": "error", "message": f"Failed to get text content: {str(e)}"}
+        fingerprint = await self._dom_fingerprint()
+        cache_key = (self.page.url, selector)
+        cached = self._text_cache.get(cache_key)
+        
+        if fingerprint is not None and cached and cached[0] == fingerprint:
+            logger.info("DOM unchanged since last read, reusing text content for: %s", selector if selector else 'page')
+            text_content = cached[1]
+        elif selector:
+            logger.info("Getting text content from selector: %s", selector)
+            element = self._loc(selector)
+            await element.wait_for(state="visible", timeout=10000)
+            text_content = await element.text_content()
+        else:
+            logger.info("Getting text content from entire page")
+            text_content = await self.page.text_content('body')
+        
+        if fingerprint is not None:
+            self._text_cache[cache_key] = (fingerprint, text_content)
+        
+        if not text_content:
+            logger.warning("No text content found")
+            return {"status": "error", "message": "No text content found"}
+        
+        logger.info("Retrieved text content: %s characters", len(text_content))
+        return {"result": {"text_content": text_content.strip()}}
+
+    @playwright_op("get attributes", timeout_message="Timeout waiting for element: {selector}")
+    async def get_element_attributes(self, selector: str, attributes: list):
+        element = self._loc(selector)
+        await element.wait_for(state="visible", timeout=10000)
+        values = await element.evaluate(ATTRIBUTES_JS, attributes, timeout=10000)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved %s/%s attributes from element: %s", sum(v is not None for v in values.values()), len(attributes), selector)
+        return {"result": values}
 
     async def get_element_attribute(self, selector: str, attribute: str):
-        try:
-            logger.info(f"Getting attribute '{attribute}' from element: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            
-            if attribute.lower() == "innertext":
-                value = await element.text_content()
-            else:
-                value = await element.get_attribute(attribute)
-            
-            if value is not None:
-                logger.info(f"Retrieved attribute '{attribute}': {value[:100]}...")
-                return {
-                    "status": "success",
-                    "result": {attribute: value}
-                }
-            else:
-                logger.warning(f"Attribute '{attribute}' not found on element: {selector}")
-                return {"status": "error", "message": f"Attribute '{attribute}' not found"}
-                
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for element: {selector}"}
-        except Exception as e:
-            logger.error(f"Error getting attribute: {str(e)}")
-            return {"status": "error", "message": f"Failed to get attribute: {str(e)}"}
+        response = await self.get_element_attributes(selector, [attribute])
+        if response["status"] != "success":
+            return response
+        
+        value = response["result"].get(attribute)
+        if value is None:
+            logger.warning("Attribute '%s' not found on element: %s", attribute, selector)
+            return {"status": "error", "message": f"Attribute '{attribute}' not found"}
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved attribute '%s': %s...", attribute, value[:100])
+        return {
+            "status": "success",
+            "result": {attribute: value}
+        }
 
+    @playwright_op("take screenshot")
     async def take_screenshot(self, filename: str = None, full_page: bool = False):
-        try:
-            if not filename:
-                timestamp = int(time.time())
-                filename = f"screenshot_{timestamp}.png"
-            else:
-                if not filename.lower().endswith('.png'):
-                    filename_without_ext = os.path.splitext(filename)[0]
-                    filename = f"{filename_without_ext}.png"
-            
-            screenshots_dir = "screenshots"
-            if not os.path.exists(screenshots_dir):
-                os.makedirs(screenshots_dir)
-            
-            filepath = os.path.join(screenshots_dir, filename)
-            
-            logger.info(f"Taking screenshot: {filepath} (full_page={full_page})")
-            await self.page.screenshot(path=filepath, full_page=full_page)
-            logger.info(f"Screenshot saved: {filepath}")
-            
-            return {
-                "status": "success",
-                "message": f"Screenshot saved to {filepath}",
-                "filepath": filepath
-            }
-        except Exception as e:
-            logger.error(f"Error taking screenshot: {str(e)}")
-            return {"status": "error", "message": f"Failed to take screenshot: {str(e)}"}
+        name = filename or f"screenshot_{int(time.time())}.png"
+        filepath = str((_screenshot_dir() / name).with_suffix('.png'))
+        
+        await self.page.screenshot(path=filepath, full_page=full_page)
+        logger.info("Screenshot saved: %s (full_page=%s)", filepath, full_page)
+        return {"message": f"Screenshot saved to {filepath}", "filepath": filepath}
 
+    @playwright_op("scroll", mutates=True)
     async def scroll_page(self, direction: str, pixels: int = 300):
-        try:
-            direction_map = {
-                "up": (0, -pixels),
-                "down": (0, pixels),
-                "left": (-pixels, 0),
-                "right": (pixels, 0)
-            }
-            
-            if direction not in direction_map:
-                return {"status": "error", "message": f"Invalid direction: {direction}"}
-            
-            dx, dy = direction_map[direction]
-            logger.info(f"Scrolling {direction} by {pixels} pixels")
-            await self.page.mouse.wheel(dx, dy)
-            logger.info(f"Scrolled {direction} by {pixels} pixels")
-            
-            return {"status": "success", "message": f"Scrolled {direction} by {pixels} pixels"}
-        except Exception as e:
-            logger.error(f"Error scrolling: {str(e)}")
-            return {"status": "error", "message": f"Failed to scroll: {str(e)}"}
+        if direction not in SCROLL_DIRECTIONS:
+            return {"status": "error", "message": f"Invalid direction: {direction}"}
+        
+        unit_x, unit_y = SCROLL_DIRECTIONS[direction]
+        await self.page.mouse.wheel(unit_x * pixels, unit_y * pixels)
+        logger.info("Scrolled %s by %s pixels", direction, pixels)
+        return {"message": f"Scrolled {direction} by {pixels} pixels"}
 
+    @playwright_op("select dropdown option", timeout_message="Timeout waiting for dropdown: {selector}", mutates=True)
     async def select_dropdown_option(self, selector: str, option_value: str):
-        try:
-            logger.info(f"Selecting option '{option_value}' from dropdown: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.select_option(value=option_value)
-            logger.info(f"Selected option '{option_value}' from dropdown: {selector}")
-            return {"status": "success", "message": f"Selected option '{option_value}' from dropdown '{selector}'"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for dropdown: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for dropdown: {selector}"}
-        except Exception as e:
-            logger.error(f"Error selecting dropdown option: {str(e)}")
-            return {"status": "error", "message": f"Failed to select dropdown option: {str(e)}"}
+        await self._loc(selector).select_option(value=option_value, timeout=10000)
+        logger.info("Selected option '%s' from dropdown: %s", option_value, selector)
+        return {"message": f"Selected option '{option_value}' from dropdown '{selector}'"}
 
+    @playwright_op("set checkbox", timeout_message="Timeout waiting for checkbox: {selector}", mutates=True)
     async def check_checkbox(self, selector: str, checked: bool = True):
-        try:
-            logger.info(f"Setting checkbox '{selector}' to {checked}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.set_checked(checked)
-            logger.info(f"Set checkbox '{selector}' to {checked}")
-            return {"status": "success", "message": f"Set checkbox '{selector}' to {checked}"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for checkbox: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for checkbox: {selector}"}
-        except Exception as e:
-            logger.error(f"Error setting checkbox: {str(e)}")
-            return {"status": "error", "message": f"Failed to set checkbox: {str(e)}"}
+        await self._loc(selector).set_checked(checked, timeout=10000)
+        logger.info("Set checkbox '%s' to %s", selector, checked)
+        return {"message": f"Set checkbox '{selector}' to {checked}"}
 
+    @playwright_op("upload file", timeout_message="Timeout waiting for file input: {selector}", mutates=True)
     async def upload_file(self, selector: str, file_path: str):
-        try:
-            logger.info(f"Uploading file '{file_path}' to element: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.set_input_files(file_path)
-            logger.info(f"Uploaded file '{file_path}' to element: {selector}")
-            return {"status": "success", "message": f"Uploaded file '{file_path}' to element '{selector}'"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for file input: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for file input: {selector}"}
-        except Exception as e:
-            logger.error(f"Error uploading file: {str(e)}")
-            return {"status": "error", "message": f"Failed to upload file: {str(e)}"}
+        await self._loc(selector).set_input_files(file_path, timeout=10000)
+        logger.info("Uploaded file '%s' to element: %s", file_path, selector)
+        return {"message": f"Uploaded file '{file_path}' to element '{selector}'"}
 
+    @playwright_op("hover over element", timeout_message="Timeout waiting for element: {selector}", mutates=True)
     async def hover_element(self, selector: str):
-        try:
-            logger.info(f"Hovering over element: {selector}")
-            element = self.page.locator(selector).first
-            await element.wait_for(state="visible", timeout=10000)
-            await element.hover()
-            logger.info(f"Hovered over element: {selector}")
-            return {"status": "success", "message": f"Hovered over element '{selector}'"}
-        except PlaywrightTimeoutError:
-            logger.error(f"Timeout waiting for element: {selector}")
-            return {"status": "error", "message": f"Timeout waiting for element: {selector}"}
-        except Exception as e:
-            logger.error(f"Error hovering over element: {str(e)}")
-            return {"status": "error", "message": f"Failed to hover over element: {str(e)}"}
+        await self._loc(selector).hover(timeout=10000)
+        logger.info("Hovered over element: %s", selector)
+        return {"message": f"Hovered over element '{selector}'"}
 
+    @playwright_op("find element by description", timeout_message="Element not found by description: {description}")
     async def find_element_by_description(self, description: str):
-        try:
-            logger.info(f"Finding element by description: {description}")
-            
-            possible_selectors = [
-                f"text={description}",
-                f"[aria-label*='{description}']",
-                f"[title*='{description}']",
-                f"[placeholder*='{description}']"
-            ]
-            
-            for selector in possible_selectors:
-                try:
-                    element = self.page.locator(selector).first
-                    await element.wait_for(state="visible", timeout=2000)
-                    logger.info(f"Found element by description using selector: {selector}")
-                    return {
-                        "status": "success",
-                        "message": f"Found element by description: {description}",
-                        "selector": selector
-                    }
-                except PlaywrightTimeoutError:
-                    continue
-            
-            logger.warning(f"Element not found by description: {description}")
-            return {"status": "error", "message": f"Element not found by description: {description}"}
-            
-        except Exception as e:
-            logger.error(f"Error finding element by description: {str(e)}")
-            return {"status": "error", "message": f"Failed to find element by description: {str(e)}"}
\ No newline at end of file
+        possible_selectors = [template.format(description) for template in DESCRIPTION_SELECTOR_TEMPLATES]
+        
+        combined = self.page.locator(possible_selectors[0])
+        for selector in possible_selectors[1:]:
+            combined = combined.or_(self.page.locator(selector))
+        
+        element = combined.filter(visible=True).first
+        await element.wait_for(state="visible", timeout=2000)
+        matched_attribute = await element.evaluate(
+            """(el, description) => ['aria-label', 'title', 'placeholder'].find(
+                (name) => (el.getAttribute(name) || '').includes(description)) || null""",
+            description
+        )
+        
+        selector = f"[{matched_attribute}*='{description}']" if matched_attribute else possible_selectors[0]
+        logger.info("Found element by description using selector: %s", selector)
+        return {"message": f"Found element by description: {description}", "selector": selector}
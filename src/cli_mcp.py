@@ -1,16 +1,21 @@
 import asyncio
 import logging
 import json
-import sys
-import os
-from datetime import datetime
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
 
-print("🚀 Starting WebMCP CLI...")
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+print("🚀 Starting WebMCP CLI...")
 
-from browser.automation import BrowserAutomation
-from llm.client import get_llm_response
+from .browser.automation import BrowserAutomation, browser_pool
+from .llm.client import aclose_openrouter_client, get_llm_response, stream_llm_response
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,6 +41,7 @@ CRITICAL:
 - If the goal is to find specific information (e.g., weather, stock price), ensure the 'get_page_text_content' action for that specific information SUCCEEDS before using 'goal_achieved'. If it fails, do not use 'goal_achieved' with a placeholder.
 
 Based on the context, decide the next single best action or a short sequence of actions (max 3 actions).
+Return up to 3 next actions as a JSON list; they are executed in order, and if one fails the remaining actions are skipped and you will be asked to re-plan from the new state.
 Output these actions as a JSON list. Each action MUST be an object with EXACTLY "action_type" and "parameters".
 
 SUPPORTED ACTION TYPES (use EXACTLY these names):
@@ -51,10 +57,11 @@ SUPPORTED ACTION TYPES (use EXACTLY these names):
 10. "wait_for_element": parameters: {"selector": "CSS selector string", "timeout_ms": number, "state": "visible/hidden/attached"}
 11. "get_page_text_content": parameters: {"selector": "CSS selector string (optional)"}
 12. "get_element_attribute": parameters: {"selector": "CSS selector string", "attribute": "string"}
-13. "take_screenshot": parameters: {"filename": "string (optional)", "full_page": true/false}
-14. "find_element_by_description": parameters: {"description": "string describing what to find"}
-15. "clarify": parameters: {"question": "string - ask user for clarification"}
-16. "goal_achieved": parameters: {"summary_of_findings": "string (optional, if information was successfully retrieved and is NOT a placeholder)"}
+13. "get_element_attributes": parameters: {"selector": "CSS selector string", "attributes": ["string", ...]} (use instead of several get_element_attribute calls on the same element)
+14. "take_screenshot": parameters: {"filename": "string (optional)", "full_page": true/false}
+15. "find_element_by_description": parameters: {"description": "string describing what to find"}
+16. "clarify": parameters: {"question": "string - ask user for clarification"}
+17. "goal_achieved": parameters: {"summary_of_findings": "string (optional, if information was successfully retrieved and is NOT a placeholder)"}
 
 CRITICAL JSON FORMAT REQUIREMENTS:
 - ALWAYS use "action_type" (not "action", "type", or anything else)
@@ -84,101 +91,191 @@ SYSTEM_PROMPT_FINAL_ANSWER = """You are an AI assistant. Based on the user's ori
 Be brief and accurate.
 """
 
-def extract_and_display_info(text_content: str, user_goal: str):
+STOCK_KEYWORDS = ('stock', 'price', 'share', 'nasdaq', 'nyse', 'trading')
+WEATHER_KEYWORDS = ('weather', 'temperature', 'climate', 'forecast')
+SEARCH_KEYWORDS = ('search', 'find', 'get', 'what', 'information')
+INFO_GOAL_KEYWORDS = ('search', 'find', 'get', 'what', 'weather', 'price', 'information')
+SCREENSHOT_KEYWORDS = ('screenshot',)
+
+GOAL_TAG_KEYWORDS = (
+    ("stock", STOCK_KEYWORDS),
+    ("weather", WEATHER_KEYWORDS),
+    ("search", SEARCH_KEYWORDS),
+    ("info", INFO_GOAL_KEYWORDS),
+    ("screenshot", SCREENSHOT_KEYWORDS),
+)
+GOAL_KEYWORD_TAGS = {
+    keyword: frozenset(tag for tag, tag_keywords in GOAL_TAG_KEYWORDS if keyword in tag_keywords)
+    for _, keywords in GOAL_TAG_KEYWORDS for keyword in keywords
+}
+GOAL_KEYWORD_RE = re.compile("(?=(" + "|".join(map(re.escape, GOAL_KEYWORD_TAGS)) + "))")
+
+PRICE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\$\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+    r'USD\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+    r'(\d{1,4}(?:,\d{3})*\.\d{2})\s*USD',
+    r'Price:\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+    r'Current:\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+))
+
+TEMPERATURE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\d{1,3})°[CF]',
+    r'(\d{1,3})\s*degrees',
+    r'Temperature:\s*(\d{1,3})',
+))
+
+MAX_STORED_PAGE_TEXT = 2000
+PAGE_TEXT_PREVIEW_SIZE = 1000
+RECENT_SUMMARY_SIZE = 3
+MAX_ACTIONS_PER_PLAN = 3
+
+SUMMARY_HEADER = """
+╔═══════════════════════════════════════════════════════════════╗
+║                    🎯 WebMCP AUTOMATION RESULT                ║
+╠═══════════════════════════════════════════════════════════════╣"""
+SUMMARY_MODELS_SECTION = """
+╠═══════════════════════════════════════════════════════════════╣
+║                      🤖 AI MODELS USED                        ║
+║ • Gemini Flash 2.0 (Primary)                                 ║
+║ • Mistral 7B Instruct (Secondary)                            ║
+║ • Llama 3.2 / DeepSeek (Backups)                             ║
+╠═══════════════════════════════════════════════════════════════╣
+║                     📋 RECENT ACTIONS                         ║"""
+SUMMARY_FOOTER = """
+╠═══════════════════════════════════════════════════════════════╣
+║                    🎬 DEMO VIDEO READY                        ║
+║ • Screenshots in: screenshots/ (if requested)                ║
+║ • Final Answer Display: IMPLEMENTED                          ║
+║ • Loop Prevention: ACTIVE                                    ║
+║ • Real-time Info Display: ENABLED                           ║
+╚═══════════════════════════════════════════════════════════════╝
+"""
+
+READ_ONLY_ACTIONS = frozenset({
+    "get_page_text_content",
+    "get_element_attribute",
+    "get_element_attributes",
+    "find_element_by_description",
+})
+
+LOAD_TRIGGERING_ACTIONS = frozenset({"click_element", "press_key"})
+SCREENSHOT_ONLY_TAGS = frozenset({"screenshot"})
+WORD_RE = re.compile(r'[a-z0-9]{4,}')
+
+def json_loads(text: str):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def json_dumps(value) -> str:
+    return orjson.dumps(value).decode('utf-8') if orjson else json.dumps(value)
+
+def classify_goal(goal_lower: str) -> frozenset:
+    return frozenset(
+        tag for match in GOAL_KEYWORD_RE.finditer(goal_lower) for tag in GOAL_KEYWORD_TAGS[match.group(1)]
+    )
+
+def first_pattern_match(patterns: tuple, text: str):
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+def first_meaningful_line(text: str, min_length: int = 10):
+    start = 0
+    while start <= len(text):
+        end = text.find('\n', start)
+        if end == -1:
+            end = len(text)
+        line = text[start:end].strip()
+        if len(line) > min_length:
+            return line
+        start = end + 1
+    return None
+
+def extract_and_display_info(text_content: str, goal_tags: frozenset):
     if not text_content:
         return
     
-    goal_lower = user_goal.lower()
-    
-    if any(keyword in goal_lower for keyword in ['stock', 'price', 'share', 'nasdaq', 'nyse', 'trading']):
-        import re
-        
-        price_patterns = [
-            r'\$\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
-            r'USD\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
-            r'(\d{1,4}(?:,\d{3})*\.\d{2})\s*USD',
-            r'Price:\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
-            r'Current:\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
-        ]
-        
-        found_prices = []
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text_content, re.IGNORECASE)
-            found_prices.extend(matches)
-        
-        if found_prices:
-            print(f"\n💰 STOCK PRICE FOUND: ${found_prices[0]}")
+    if "stock" in goal_tags:
+        found_price = first_pattern_match(PRICE_PATTERNS, text_content)
+        if found_price:
+            print(f"\n💰 STOCK PRICE FOUND: ${found_price}")
             print(f"🔍 Source: Page content analysis")
     
-    elif any(keyword in goal_lower for keyword in ['weather', 'temperature', 'climate', 'forecast']):
-        import re
-        
-        temp_patterns = [
-            r'(\d{1,3})°[CF]',
-            r'(\d{1,3})\s*degrees',
-            r'Temperature:\s*(\d{1,3})',
-        ]
-        
-        found_temps = []
-        for pattern in temp_patterns:
-            matches = re.findall(pattern, text_content, re.IGNORECASE)
-            found_temps.extend(matches)
-        
-        if found_temps:
-            print(f"\n🌡️ TEMPERATURE FOUND: {found_temps[0]}°")
+    elif "weather" in goal_tags:
+        found_temp = first_pattern_match(TEMPERATURE_PATTERNS, text_content)
+        if found_temp:
+            print(f"\n🌡️ TEMPERATURE FOUND: {found_temp}°")
             print(f"🔍 Source: Weather widget analysis")
     
-    elif any(keyword in goal_lower for keyword in ['search', 'find', 'get', 'what', 'information']):
-        lines = text_content.split('\n')
-        meaningful_lines = [line.strip() for line in lines if line.strip() and len(line.strip()) > 10]
-        if meaningful_lines:
+    elif "search" in goal_tags:
+        meaningful_line = first_meaningful_line(text_content)
+        if meaningful_line:
             print(f"\n📄 INFORMATION FOUND:")
-            print(f"   {meaningful_lines[0][:100]}...")
+            print(f"   {meaningful_line[:100]}...")
             print(f"🔍 Source: Page content analysis")
 
-async def mcp_loop(user_goal: str, headless: bool = True, max_iterations: int = 25) -> dict:
-    logger.info(f"Starting MCP for goal: {user_goal}")
-    
-    interaction_context = {
-        "user_goal": user_goal,
-        "history": [],
-        "current_page_url": None,
-        "last_error": None,
-        "last_page_text_content": None,
-        "final_answer_to_goal": None,
-        "summary_from_goal_achieved": None,
-        "information_retrieved_successfully": False,
-        "screenshot_taken": False,
-        "task_completed": False,
-        "last_action_type": None,
-        "action_repeat_count": 0
-    }
-    
-    async with BrowserAutomation(headless=headless) as browser:
-        for iteration in range(1, max_iterations + 1):
-            logger.info(f"\nMCP Iteration: {iteration}/{max_iterations}. Goal: {user_goal}")
-            
-            if interaction_context["task_completed"]:
-                logger.info("MCP: Task marked as completed, exiting loop")
-                break
-            
-            mcp_prompt_for_llm = f"User Goal: {user_goal}\n"
-            if iteration == 1:
-                mcp_prompt_for_llm += "This is the first iteration. Browser is ready. What is the first action?"
-            else:
-                history_summary = "\n".join([
-                    f"Action: {h['action_taken'].get('action_type', 'unknown')} -> Result: {h['outcome']['status']}" +
-                    (f" ({h['outcome']['message']})" if h['outcome'].get('message') else "")
-                    for h in interaction_context["history"][-3:]
-                ])
-                page_content_info = f"\nLast successfully retrieved page content (first 1000 chars):\n{interaction_context.get('last_page_text_content', '')[:1000]}..." if interaction_context.get('last_page_text_content') else "\nNo page content successfully retrieved yet."
-                
-                completion_info = f"\nScreenshot taken: {interaction_context['screenshot_taken']}\nLast action: {interaction_context['last_action_type']}\nAction repeat count: {interaction_context['action_repeat_count']}"
-                
-                mcp_prompt_for_llm += f"""Current page: {interaction_context.get('current_page_url', 'Unknown')}
+@dataclass(slots=True)
+class MCPContext:
+    user_goal: str
+    goal_lower: str = field(init=False)
+    goal_trunc: str = field(init=False)
+    goal_tags: frozenset = field(init=False)
+    recent_summaries: deque = field(default_factory=lambda: deque(maxlen=RECENT_SUMMARY_SIZE))
+    recent_actions: deque = field(default_factory=lambda: deque(maxlen=RECENT_SUMMARY_SIZE))
+    actions_completed: int = 0
+    current_page_url: str | None = None
+    last_error: str | None = None
+    last_page_text_content: str | None = None
+    last_page_text_preview: str | None = None
+    last_page_text_content_len: int = 0
+    final_answer_to_goal: str | None = None
+    summary_from_goal_achieved: str | None = None
+    information_retrieved_successfully: bool = False
+    screenshot_taken: bool = False
+    last_screenshot_path: str | None = None
+    task_completed: bool = False
+    last_action_type: str | None = None
+    action_repeat_count: int = 0
+
+    def __post_init__(self):
+        self.goal_lower = self.user_goal.lower()
+        self.goal_trunc = self.user_goal[:45].ljust(45)
+        self.goal_tags = classify_goal(self.goal_lower)
+
+def record_action(interaction_context: MCPContext, action: dict, outcome: dict):
+    action_log = {"action_taken": action, "outcome": outcome}
+    interaction_context.recent_actions.append(action_log)
+    interaction_context.actions_completed += 1
+    interaction_context.recent_summaries.append(
+        f"Action: {action.get('action_type', 'unknown')} -> Result: {outcome['status']}" +
+        (f" ({outcome['message']})" if outcome.get('message') else "")
+    )
+
+def store_page_text(interaction_context: MCPContext, text_content):
+    if text_content:
+        interaction_context.last_page_text_content = text_content[:MAX_STORED_PAGE_TEXT]
+        interaction_context.last_page_text_preview = text_content[:PAGE_TEXT_PREVIEW_SIZE]
+        interaction_context.last_page_text_content_len = len(text_content)
+    else:
+        interaction_context.last_page_text_content = None
+        interaction_context.last_page_text_preview = None
+        interaction_context.last_page_text_content_len = 0
+
+def build_mcp_prompt(interaction_context: MCPContext, iteration: int, max_iterations: int) -> str:
+    mcp_prompt_for_llm = f"User Goal: {interaction_context.user_goal}\n"
+    if iteration == 1:
+        mcp_prompt_for_llm += "This is the first iteration. Browser is ready. What is the first action?"
+    else:
+        history_summary = "\n".join(interaction_context.recent_summaries)
+        page_content_info = f"\nLast successfully retrieved page content (first {len(interaction_context.last_page_text_preview)} of {interaction_context.last_page_text_content_len} chars):\n{interaction_context.last_page_text_preview}..." if interaction_context.last_page_text_preview else "\nNo page content successfully retrieved yet."
+        
+        completion_info = f"\nScreenshot taken: {interaction_context.screenshot_taken}\nLast action: {interaction_context.last_action_type}\nAction repeat count: {interaction_context.action_repeat_count}"
+        
+        mcp_prompt_for_llm += f"""Current page: {interaction_context.current_page_url}
 Iteration: {iteration}/{max_iterations}
-Last error: {interaction_context.get('last_error', 'None')}
-Information retrieved successfully so far: {interaction_context['information_retrieved_successfully']}
+Last error: {interaction_context.last_error}
+Information retrieved successfully so far: {interaction_context.information_retrieved_successfully}
 {completion_info}
 Recent actions:
 {history_summary}
@@ -187,262 +284,398 @@ What should be the next action(s)? If specific information was successfully retr
 IMPORTANT: If you just took a screenshot and user requested one, use 'goal_achieved' IMMEDIATELY. If you retrieved information successfully, use 'goal_achieved' IMMEDIATELY.
 REMEMBER: Return ONLY a JSON array. Use "take_screenshot" sparingly.
 """
+    return mcp_prompt_for_llm
+
+def normalize_action(action) -> dict:
+    if not isinstance(action, dict): raise ValueError(f"Action not a dict: {type(action)}")
+    if "action_type" not in action:
+        if "action" in action: action["action_type"] = action.pop("action"); logger.warning("Fixed 'action'->'action_type'")
+        elif "type" in action: action["action_type"] = action.pop("type"); logger.warning("Fixed 'type'->'action_type'")
+        else: raise ValueError(f"Action missing 'action_type': {action}")
+    if "parameters" not in action:
+        action_type = action.pop("action_type")
+        logger.warning(f"Fixed parameters for: {action_type}")
+        return {"action_type": action_type, "parameters": action}
+    return action
+
+class JSONObjectStream:
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list:
+        objects = []
+        for char in chunk:
+            if not self._depth:
+                if char == '{':
+                    self._buffer = ['{']
+                    self._depth = 1
+                continue
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if not self._depth:
+                    objects.append(json_loads(''.join(self._buffer)))
+        return objects
+
+class ActionPlanStream:
+    def __init__(self, interaction_context: MCPContext, iteration: int, max_iterations: int):
+        self.actions = []
+        self.error = None
+        self.raw_text = ""
+        self._done = False
+        self._abandoned = False
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._produce(build_mcp_prompt(interaction_context, iteration, max_iterations)))
+
+    def _add_actions(self, objects: list):
+        for obj in objects:
+            if len(self.actions) >= MAX_ACTIONS_PER_PLAN:
+                break
+            action = normalize_action(obj)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("MCP: LLM Action: %s", json_dumps(action))
+            self.actions.append(action)
+        self._changed.set()
+
+    async def _produce(self, mcp_prompt_for_llm: str):
+        parser = JSONObjectStream()
+        chunks = stream_llm_response(SYSTEM_PROMPT_MCP, mcp_prompt_for_llm)
+        raw_chunks = []
+        try:
+            async for chunk in chunks:
+                raw_chunks.append(chunk)
+                self._add_actions(parser.feed(chunk))
+                if self._abandoned:
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            await chunks.aclose()
+            self.raw_text = ''.join(raw_chunks)
+            self._done = True
+            self._changed.set()
+
+    def abandon(self):
+        self._abandoned = True
+
+    async def __aiter__(self):
+        index = 0
+        while True:
+            if index < len(self.actions):
+                yield index, self.actions[index]
+                index += 1
+            elif self._done or index >= MAX_ACTIONS_PER_PLAN:
+                return
+            else:
+                self._changed.clear()
+                await self._changed.wait()
+
+def deterministic_answer(interaction_context: MCPContext):
+    if interaction_context.goal_tags == SCREENSHOT_ONLY_TAGS and interaction_context.last_screenshot_path:
+        return f"Screenshot saved to {interaction_context.last_screenshot_path}."
+    summary = interaction_context.summary_from_goal_achieved
+    if (interaction_context.last_action_type == "goal_achieved"
+            and interaction_context.information_retrieved_successfully and summary):
+        goal_words = set(WORD_RE.findall(interaction_context.goal_lower))
+        if goal_words.intersection(WORD_RE.findall(summary.lower())):
+            return f"Result: {summary}"
+    return None
+
+async def synthesize_final_answer(browser: BrowserAutomation, final_answer_prompt_context: str, interaction_context: MCPContext) -> str:
+    answer = deterministic_answer(interaction_context)
+    if answer:
+        logger.info("MCP: Final answer determined without an LLM call.")
+        await browser.close()
+        return answer
+    print("\n💬 Final answer:", flush=True)
+    synthesized_answer, _ = await asyncio.gather(
+        get_llm_response(SYSTEM_PROMPT_FINAL_ANSWER, final_answer_prompt_context, is_final_answer_generation=True, stream=True),
+        browser.close()
+    )
+    return synthesized_answer
+
+async def settle_after_action(browser: BrowserAutomation, action_type: str):
+    if action_type in LOAD_TRIGGERING_ACTIONS:
+        await browser.wait_for_dom_ready()
+
+async def mcp_loop(user_goal: str, headless: bool = True, max_iterations: int = 25) -> dict:
+    logger.info(f"Starting MCP for goal: {user_goal}")
+    
+    interaction_context = MCPContext(user_goal)
+    
+    async with BrowserAutomation(headless=headless) as browser:
+        for iteration in range(1, max_iterations + 1):
+            logger.info(f"\nMCP Iteration: {iteration}/{max_iterations}. Goal: {user_goal}")
             
-            actions_to_execute_json_str = get_llm_response(SYSTEM_PROMPT_MCP, mcp_prompt_for_llm)
+            if interaction_context.task_completed:
+                logger.info("MCP: Task marked as completed, exiting loop")
+                break
             
-            if not actions_to_execute_json_str:
-                logger.error("MCP: Could not get an action plan from LLM.")
-                if iteration > 1:
-                    logger.info("MCP: Fallback - taking screenshot for debugging if stuck.")
-                    await browser.take_screenshot(f"debug_iter_{iteration}_stuck.png")
-                await asyncio.sleep(2)
-                continue
+            plan = ActionPlanStream(interaction_context, iteration, max_iterations)
             
-            try: 
-                actions_to_execute = json.loads(actions_to_execute_json_str)
-                if not isinstance(actions_to_execute, list): actions_to_execute = [actions_to_execute]
-                for action in actions_to_execute:
-                    if not isinstance(action, dict): raise ValueError(f"Action not a dict: {type(action)}")
-                    if "action_type" not in action:
-                        if "action" in action: action["action_type"] = action.pop("action"); logger.warning("Fixed 'action'->'action_type'")
-                        elif "type" in action: action["action_type"] = action.pop("type"); logger.warning("Fixed 'type'->'action_type'")
-                        else: raise ValueError(f"Action missing 'action_type': {action}")
-                    if "parameters" not in action:
-                        action["parameters"] = {k: v for k, v in action.items() if k not in ["action_type", "parameters"]}
-                        for k_orig in list(action["parameters"].keys()): action.pop(k_orig)
-                        logger.warning(f"Fixed parameters for: {action['action_type']}")
-                logger.info(f"MCP: LLM Action Plan:\n{json.dumps(actions_to_execute, indent=2)}")
-            except Exception as e:
-                logger.error(f"MCP: JSON/Action validation error: {e}. Raw: {actions_to_execute_json_str}")
-                await asyncio.sleep(2)
-                continue
-
-            for action_idx, action in enumerate(actions_to_execute):
+            prefetched = {}
+            async for action_idx, action in plan:
                 action_type = action.get("action_type")
                 parameters = action.get("parameters", {})
-                logger.info(f"MCP: Executing ({action_idx+1}/{len(actions_to_execute)}): {action_type} with {parameters}")
+                logger.info(f"MCP: Executing ({action_idx+1}): {action_type} with {parameters}")
 
-                if action_type == interaction_context["last_action_type"]:
-                    interaction_context["action_repeat_count"] += 1
-                    if interaction_context["action_repeat_count"] >= 3:
+                if action_type == interaction_context.last_action_type:
+                    interaction_context.action_repeat_count += 1
+                    if interaction_context.action_repeat_count >= 3:
                         logger.warning(f"MCP: Detected potential infinite loop with action '{action_type}', forcing completion")
-                        interaction_context["task_completed"] = True
-                        interaction_context["summary_from_goal_achieved"] = f"Task completion forced due to repeated actions. Last successful action was {action_type}."
+                        interaction_context.task_completed = True
+                        interaction_context.summary_from_goal_achieved = f"Task completion forced due to repeated actions. Last successful action was {action_type}."
                         break
                 else:
-                    interaction_context["last_action_type"] = action_type
-                    interaction_context["action_repeat_count"] = 1
+                    interaction_context.last_action_type = action_type
+                    interaction_context.action_repeat_count = 1
 
                 if action_type == "clarify":
                     question = parameters.get("question", "More info needed.")
                     print(f"\n❓ LLM Clarification: {question}")
-                    user_response = input("Your response: ")
-                    interaction_context["history"].append({"action_taken": action, "outcome": {"status": "success", "message": f"User: {user_response}"}})
-                    interaction_context["last_page_text_content"] = f"User clarification: {user_response}"
-                    interaction_context["information_retrieved_successfully"] = False
+                    user_response = await ainput("Your response: ")
+                    record_action(interaction_context, action, {"status": "success", "message": f"User: {user_response}"})
+                    store_page_text(interaction_context, f"User clarification: {user_response}")
+                    interaction_context.information_retrieved_successfully = False
                     continue
                 
                 if action_type == "goal_achieved":
                     logger.info("MCP: LLM indicated goal achieved.")
-                    interaction_context["summary_from_goal_achieved"] = parameters.get("summary_of_findings")
-                    interaction_context["task_completed"] = True
+                    interaction_context.summary_from_goal_achieved = parameters.get("summary_of_findings")
+                    interaction_context.task_completed = True
                     
-                    if interaction_context["summary_from_goal_achieved"] and "[" in interaction_context["summary_from_goal_achieved"] and "]" in interaction_context["summary_from_goal_achieved"]:
-                        logger.warning(f"Goal achieved called with placeholder summary: {interaction_context['summary_from_goal_achieved']}. Will indicate failure to retrieve info.")
-                        interaction_context["information_retrieved_successfully"] = False
-                    elif interaction_context["summary_from_goal_achieved"]:
-                         interaction_context["information_retrieved_successfully"] = True
+                    if interaction_context.summary_from_goal_achieved and "[" in interaction_context.summary_from_goal_achieved and "]" in interaction_context.summary_from_goal_achieved:
+                        logger.warning(f"Goal achieved called with placeholder summary: {interaction_context.summary_from_goal_achieved}. Will indicate failure to retrieve info.")
+                        interaction_context.information_retrieved_successfully = False
+                    elif interaction_context.summary_from_goal_achieved:
+                         interaction_context.information_retrieved_successfully = True
 
                     final_answer_prompt_context = f"User's original goal: '{user_goal}'\n"
-                    if interaction_context["information_retrieved_successfully"] and interaction_context["summary_from_goal_achieved"]:
-                        final_answer_prompt_context += f"The AI performing the web task provided this summary: '{interaction_context['summary_from_goal_achieved']}'\n"
-                    elif interaction_context["information_retrieved_successfully"] and interaction_context["last_page_text_content"]:
-                         final_answer_prompt_context += f"The following information was gathered from the last page:\n---\n{interaction_context['last_page_text_content'][:2000]}\n---\n"
+                    if interaction_context.information_retrieved_successfully and interaction_context.summary_from_goal_achieved:
+                        final_answer_prompt_context += f"The AI performing the web task provided this summary: '{interaction_context.summary_from_goal_achieved}'\n"
+                    elif interaction_context.information_retrieved_successfully and interaction_context.last_page_text_content:
+                         final_answer_prompt_context += f"The following information was gathered from the last page:\n---\n{interaction_context.last_page_text_content}\n---\n"
                     else:
                         final_answer_prompt_context += "The necessary information could not be successfully retrieved from the webpage.\n"
                     final_answer_prompt_context += "Based on this, what is the direct answer to the user's goal? If the goal was an action, confirm its completion. If info was not found, state that."
                     
-                    synthesized_answer = get_llm_response(SYSTEM_PROMPT_FINAL_ANSWER, final_answer_prompt_context, is_final_answer_generation=True)
-                    interaction_context["final_answer_to_goal"] = synthesized_answer if synthesized_answer else "Goal marked as achieved by AI, but could not synthesize a final textual answer."
+                    plan.abandon()
+                    synthesized_answer = await synthesize_final_answer(browser, final_answer_prompt_context, interaction_context)
+                    interaction_context.final_answer_to_goal = synthesized_answer if synthesized_answer else "Goal marked as achieved by AI, but could not synthesize a final textual answer."
                     
                     final_summary = generate_result_summary(interaction_context, iteration)
                     print(final_summary)
                     return {
-                        "status": "success" if interaction_context["information_retrieved_successfully"] else "partial_failure", 
+                        "status": "success" if interaction_context.information_retrieved_successfully else "partial_failure", 
                         "message": "Goal processing complete.",
-                        "iterations_used": iteration, "actions_completed": len(interaction_context["history"]),
-                        "summary": final_summary, "final_answer": interaction_context["final_answer_to_goal"]
+                        "iterations_used": iteration, "actions_completed": interaction_context.actions_completed,
+                        "summary": final_summary, "final_answer": interaction_context.final_answer_to_goal
                     }
 
-                result = await execute_browser_action(browser, action_type, parameters)
-                interaction_context["history"].append({"action_taken": action, "outcome": result})
+                if action_type in READ_ONLY_ACTIONS and action_idx not in prefetched:
+                    for later_idx in range(action_idx, len(plan.actions)):
+                        later_action = plan.actions[later_idx]
+                        if later_action.get("action_type") not in READ_ONLY_ACTIONS:
+                            break
+                        prefetched[later_idx] = asyncio.create_task(
+                            execute_browser_action(browser, later_action["action_type"], later_action.get("parameters", {}))
+                        )
+                
+                if action_idx in prefetched:
+                    result = await prefetched.pop(action_idx)
+                else:
+                    result = await execute_browser_action(browser, action_type, parameters)
+                record_action(interaction_context, action, result)
                 
                 if result['status'] == 'success':
-                    interaction_context["last_error"] = None
+                    interaction_context.last_error = None
                     if action_type == "navigate": 
-                        interaction_context["current_page_url"] = result.get('url', parameters.get('url'))
-                        interaction_context["last_page_text_content"] = None
-                        interaction_context["information_retrieved_successfully"] = False
-                        print(f"\n🌐 Navigated to: {interaction_context['current_page_url']}")
+                        interaction_context.current_page_url = result.get('url', parameters.get('url'))
+                        store_page_text(interaction_context, None)
+                        interaction_context.information_retrieved_successfully = False
+                        print(f"\n🌐 Navigated to: {interaction_context.current_page_url}")
                     elif action_type == "get_page_text_content":
                         text_content = result.get('result', {}).get('text_content', '')
                         if text_content:
-                            interaction_context["last_page_text_content"] = text_content
-                            interaction_context["information_retrieved_successfully"] = True
+                            store_page_text(interaction_context, text_content)
+                            interaction_context.information_retrieved_successfully = True
                             logger.info(f"📄 Page content captured: {len(text_content)} chars.")
                             
-                            extract_and_display_info(text_content, user_goal)
+                            extract_and_display_info(text_content, interaction_context.goal_tags)
                             
-                            if any(keyword in user_goal.lower() for keyword in ['search', 'find', 'get', 'what', 'weather', 'price', 'information']):
+                            if "info" in interaction_context.goal_tags:
                                 logger.info("MCP: Information retrieval goal detected and completed")
-                                interaction_context["task_completed"] = True
-                                interaction_context["summary_from_goal_achieved"] = f"Successfully retrieved information: {text_content[:200]}..."
+                                interaction_context.task_completed = True
+                                interaction_context.summary_from_goal_achieved = f"Successfully retrieved information: {text_content[:200]}..."
                         else:
                             logger.warning("MCP: get_page_text_content returned empty. Info not retrieved.")
-                            interaction_context["information_retrieved_successfully"] = False
+                            interaction_context.information_retrieved_successfully = False
                     elif action_type == "take_screenshot":
-                        interaction_context["screenshot_taken"] = True
+                        interaction_context.screenshot_taken = True
                         screenshot_path = result.get('filepath', 'screenshot completed')
+                        interaction_context.last_screenshot_path = result.get('filepath')
                         print(f"\n📸 Screenshot saved: {screenshot_path}")
-                        if 'screenshot' in user_goal.lower():
+                        if "screenshot" in interaction_context.goal_tags:
                             logger.info("MCP: Screenshot goal detected and completed")
-                            interaction_context["task_completed"] = True
-                            interaction_context["summary_from_goal_achieved"] = f"Successfully took screenshot: {screenshot_path}"
-                            interaction_context["information_retrieved_successfully"] = True
+                            interaction_context.task_completed = True
+                            interaction_context.summary_from_goal_achieved = f"Successfully took screenshot: {screenshot_path}"
+                            interaction_context.information_retrieved_successfully = True
                 else:
-                    interaction_context["last_error"] = result.get('message', 'Unknown error')
-                    interaction_context["information_retrieved_successfully"] = False
+                    interaction_context.last_error = result.get('message', 'Unknown error')
+                    interaction_context.information_retrieved_successfully = False
                 
                 logger.info(f"MCP: Result ({action_type}): {result['status']}" + (f" - {result['message']}" if result.get('message') else ""))
-                await asyncio.sleep(0.5)
+                await settle_after_action(browser, action_type)
                 
-                if interaction_context["task_completed"]:
+                if interaction_context.task_completed:
                     logger.info("MCP: Task completed automatically, breaking action loop")
                     break
+                
+                if result['status'] != 'success':
+                    logger.info("MCP: Action failed, skipping the rest of the plan and re-planning")
+                    break
+            
+            plan.abandon()
+            for task in prefetched.values():
+                task.cancel()
+            await asyncio.gather(*prefetched.values(), return_exceptions=True)
             
-            if interaction_context["task_completed"]:
+            if interaction_context.task_completed:
                 break
-                
-            await asyncio.sleep(1) 
+            
+            if plan.error is not None:
+                logger.error(f"MCP: JSON/Action validation error: {plan.error}. Raw: {plan.raw_text}")
+                await asyncio.sleep(2)
+                continue
+            
+            if not plan.actions:
+                logger.error("MCP: Could not get an action plan from LLM.")
+                if iteration > 1:
+                    logger.info("MCP: Fallback - taking screenshot for debugging if stuck.")
+                    await browser.take_screenshot(f"debug_iter_{iteration}_stuck.png")
+                await asyncio.sleep(2)
+                continue
         
-        if not interaction_context["task_completed"]:
+        if not interaction_context.task_completed:
             logger.warning("MCP: Max iterations reached.")
             final_answer_prompt_context = f"User's original goal: '{user_goal}'\nTask ended after {max_iterations} iterations.\n"
-            if interaction_context["information_retrieved_successfully"] and interaction_context["last_page_text_content"]:
-                final_answer_prompt_context += f"Information from last page:\n{interaction_context['last_page_text_content'][:2000]}\n\n"
+            if interaction_context.information_retrieved_successfully and interaction_context.last_page_text_content:
+                final_answer_prompt_context += f"Information from last page:\n{interaction_context.last_page_text_content}\n\n"
             else:
                 final_answer_prompt_context += "The necessary information could not be successfully retrieved within the allowed iterations.\n"
             final_answer_prompt_context += "Answer the goal based on available info, or state what was done and that max iterations were reached and info might be missing."
             
-            synthesized_answer = get_llm_response(SYSTEM_PROMPT_FINAL_ANSWER, final_answer_prompt_context, is_final_answer_generation=True)
-            interaction_context["final_answer_to_goal"] = synthesized_answer if synthesized_answer else "Max iterations reached; could not synthesize a final answer."
+            synthesized_answer = await synthesize_final_answer(browser, final_answer_prompt_context, interaction_context)
+            interaction_context.final_answer_to_goal = synthesized_answer if synthesized_answer else "Max iterations reached; could not synthesize a final answer."
 
             final_summary = generate_result_summary(interaction_context, max_iterations)
             print(final_summary)
             return {
                 "status": "max_iterations_reached", "iterations_used": max_iterations,
-                "actions_completed": len(interaction_context["history"]),
-                "message": f"Completed {len(interaction_context['history'])} actions in {max_iterations} iterations.",
-                "summary": final_summary, "final_answer": interaction_context["final_answer_to_goal"]
+                "actions_completed": interaction_context.actions_completed,
+                "message": f"Completed {interaction_context.actions_completed} actions in {max_iterations} iterations.",
+                "summary": final_summary, "final_answer": interaction_context.final_answer_to_goal
             }
         else:
             final_answer_prompt_context = f"User's original goal: '{user_goal}'\n"
-            if interaction_context["summary_from_goal_achieved"]:
-                final_answer_prompt_context += f"Task completed: {interaction_context['summary_from_goal_achieved']}\n"
-            elif interaction_context["screenshot_taken"]:
+            if interaction_context.summary_from_goal_achieved:
+                final_answer_prompt_context += f"Task completed: {interaction_context.summary_from_goal_achieved}\n"
+            elif interaction_context.screenshot_taken:
                 final_answer_prompt_context += "Screenshot was taken successfully.\n"
-            elif interaction_context["information_retrieved_successfully"]:
-                final_answer_prompt_context += f"Information was retrieved: {interaction_context['last_page_text_content'][:500] if interaction_context['last_page_text_content'] else 'Content available'}\n"
+            elif interaction_context.information_retrieved_successfully:
+                final_answer_prompt_context += f"Information was retrieved: {interaction_context.last_page_text_content[:500] if interaction_context.last_page_text_content else 'Content available'}\n"
             
-            synthesized_answer = get_llm_response(SYSTEM_PROMPT_FINAL_ANSWER, final_answer_prompt_context, is_final_answer_generation=True)
-            interaction_context["final_answer_to_goal"] = synthesized_answer if synthesized_answer else "Task completed automatically."
+            synthesized_answer = await synthesize_final_answer(browser, final_answer_prompt_context, interaction_context)
+            interaction_context.final_answer_to_goal = synthesized_answer if synthesized_answer else "Task completed automatically."
 
             final_summary = generate_result_summary(interaction_context, iteration)
             print(final_summary)
             return {
                 "status": "success", "iterations_used": iteration,
-                "actions_completed": len(interaction_context["history"]),
+                "actions_completed": interaction_context.actions_completed,
                 "message": "Task completed successfully.",
-                "summary": final_summary, "final_answer": interaction_context["final_answer_to_goal"]
+                "summary": final_summary, "final_answer": interaction_context.final_answer_to_goal
             }
 
-def generate_result_summary(context, iterations_used):
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    final_answer = context.get("final_answer_to_goal", "Not synthesized.")
-    info_retrieved_successfully = context.get("information_retrieved_successfully", False)
+def generate_result_summary(context: MCPContext, iterations_used: int):
+    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    final_answer = context.final_answer_to_goal or "Not synthesized."
+    final_answer_lower = final_answer.lower()
+    info_retrieved_successfully = context.information_retrieved_successfully
     
     status_text = "⚠️ PARTIAL/CHECK"
-    if context.get("last_error") is None and "Could not synthesize" not in final_answer and "Max iterations reached" not in final_answer:
-        if info_retrieved_successfully or "Goal marked as achieved by AI" in final_answer or "confirm its completion" in final_answer.lower() or "task completed" in final_answer.lower() :
-             if not ("could not be retrieved" in final_answer.lower() or "unable to find" in final_answer.lower() or "[some_information]" in final_answer or "[weather_information]" in final_answer):
+    if context.last_error is None and "Could not synthesize" not in final_answer and "Max iterations reached" not in final_answer:
+        if info_retrieved_successfully or "Goal marked as achieved by AI" in final_answer or "confirm its completion" in final_answer_lower or "task completed" in final_answer_lower :
+             if not ("could not be retrieved" in final_answer_lower or "unable to find" in final_answer_lower or "[some_information]" in final_answer or "[weather_information]" in final_answer):
                 status_text = "✅ SUCCESS"
 
-    summary = f"""
-╔═══════════════════════════════════════════════════════════════╗
-║                    🎯 WebMCP AUTOMATION RESULT                ║
-╠═══════════════════════════════════════════════════════════════╣
+    parts = [SUMMARY_HEADER, f"""
 ║ 📅 Completed: {current_time}                            ║
-║ 🎯 Goal: {context['user_goal'][:45]:<45} ║
+║ 🎯 Goal: {context.goal_trunc} ║
 ║ 🔄 Iterations: {iterations_used:<8} Max: 25                     ║
-║ ⚡ Actions: {len(context['history']):<6}                                  ║
-║ 🌐 Final URL: {(context.get('current_page_url', 'N/A'))[:43]:<43} ║
+║ ⚡ Actions: {context.actions_completed:<6}                                  ║
+║ 🌐 Final URL: {(context.current_page_url or 'N/A')[:43]:<43} ║
 ║ 📊 Status: {status_text:<43} ║
 ╠═══════════════════════════════════════════════════════════════╣
 ║ 💬 FINAL ANSWER TO GOAL:                                      ║
-║ >> {final_answer[:60]:<60} ║"""
+║ >> {final_answer[:60]:<60} ║"""]
     if len(final_answer) > 60:
-        summary += f"""
-║    {final_answer[60:120]:<60} ║"""
+        parts.append(f"""
+║    {final_answer[60:120]:<60} ║""")
     if len(final_answer) > 120:
-        summary += f"""
-║    ... (see full answer above/below)                         ║"""
-    summary += f"""
-╠═══════════════════════════════════════════════════════════════╣
-║                      🤖 AI MODELS USED                        ║
-║ • Gemini Flash 2.0 (Primary)                                 ║
-║ • Mistral 7B Instruct (Secondary)                            ║
-║ • Llama 3.2 / DeepSeek (Backups)                             ║
-╠═══════════════════════════════════════════════════════════════╣
-║                     📋 RECENT ACTIONS                         ║"""
+        parts.append("""
+║    ... (see full answer above/below)                         ║""")
+    parts.append(SUMMARY_MODELS_SECTION)
     
-    for i, action_log in enumerate(context["history"][-3:], 1): 
+    for i, action_log in enumerate(context.recent_actions, 1): 
         action_type = action_log["action_taken"].get("action_type", "unknown")
         status_icon = "✅" if action_log["outcome"]["status"] == "success" else "❌"
-        summary += f"""
-║ {i}. {status_icon} {action_type:<25} {action_log["outcome"]["status"]:<12} ║"""
-    if len(context["history"]) > 3: summary += f"""
-║    ... and {len(context['history']) - 3} more actions earlier                     ║"""
+        parts.append(f"""
+║ {i}. {status_icon} {action_type:<25} {action_log["outcome"]["status"]:<12} ║""")
+    if context.actions_completed > 3: parts.append(f"""
+║    ... and {context.actions_completed - 3} more actions earlier                     ║""")
     
-    summary += f"""
-╠═══════════════════════════════════════════════════════════════╣
-║                    🎬 DEMO VIDEO READY                        ║
-║ • Screenshots in: screenshots/ (if requested)                ║
-║ • Final Answer Display: IMPLEMENTED                          ║
-║ • Loop Prevention: ACTIVE                                    ║
-║ • Real-time Info Display: ENABLED                           ║
-╚═══════════════════════════════════════════════════════════════╝
-"""
-    return summary
+    parts.append(SUMMARY_FOOTER)
+    return ''.join(parts)
+
+BROWSER_ACTIONS = {
+    "navigate": lambda browser, params: browser.navigate(params["url"]),
+    "click_element": lambda browser, params: browser.click_element(params["selector"]),
+    "type_into_element": lambda browser, params: browser.type_into_element(params["selector"], params["text"]),
+    "select_dropdown_option": lambda browser, params: browser.select_dropdown_option(params["selector"], params["option_value"]),
+    "check_checkbox": lambda browser, params: browser.check_checkbox(params["selector"], params.get("checked", True)),
+    "upload_file": lambda browser, params: browser.upload_file(params["selector"], params["file_path"]),
+    "hover_element": lambda browser, params: browser.hover_element(params["selector"]),
+    "scroll_page": lambda browser, params: browser.scroll_page(params["direction"], params.get("pixels", 300)),
+    "press_key": lambda browser, params: browser.press_key(params["key"], params.get("selector")),
+    "wait_for_element": lambda browser, params: browser.wait_for_element(params["selector"], params.get("timeout_ms", 10000), params.get("state", "visible")),
+    "get_page_text_content": lambda browser, params: browser.get_page_text_content(params.get("selector")),
+    "get_element_attribute": lambda browser, params: browser.get_element_attribute(params["selector"], params["attribute"]),
+    "get_element_attributes": lambda browser, params: browser.get_element_attributes(params["selector"], params["attributes"]),
+    "take_screenshot": lambda browser, params: browser.take_screenshot(params.get("filename"), params.get("full_page", False)),
+    "find_element_by_description": lambda browser, params: browser.find_element_by_description(params["description"]),
+}
 
 async def execute_browser_action(browser: BrowserAutomation, action_type: str, parameters: dict) -> dict:
+    browser_action = BROWSER_ACTIONS.get(action_type)
+    if browser_action is None:
+        return {"status": "error", "message": f"Unknown action type: {action_type}"}
     try:
-        if action_type == "navigate": return await browser.navigate(parameters["url"])
-        elif action_type == "click_element": return await browser.click_element(parameters["selector"])
-        elif action_type == "type_into_element": return await browser.type_into_element(parameters["selector"], parameters["text"])
-        elif action_type == "select_dropdown_option": return await browser.select_dropdown_option(parameters["selector"], parameters["option_value"])
-        elif action_type == "check_checkbox": return await browser.check_checkbox(parameters["selector"], parameters.get("checked", True))
-        elif action_type == "upload_file": return await browser.upload_file(parameters["selector"], parameters["file_path"])
-        elif action_type == "hover_element": return await browser.hover_element(parameters["selector"])
-        elif action_type == "scroll_page": return await browser.scroll_page(parameters["direction"], parameters.get("pixels", 300))
-        elif action_type == "press_key":
-            return await browser.press_key(parameters["key"], parameters.get("selector"))
-        elif action_type == "wait_for_element":
-            return await browser.wait_for_element(parameters["selector"], parameters.get("timeout_ms", 10000), parameters.get("state", "visible"))
-        elif action_type == "get_page_text_content": return await browser.get_page_text_content(parameters.get("selector"))
-        elif action_type == "get_element_attribute": return await browser.get_element_attribute(parameters["selector"], parameters["attribute"])
-        elif action_type == "take_screenshot": return await browser.take_screenshot(parameters.get("filename"), parameters.get("full_page", False))
-        elif action_type == "find_element_by_description": return await browser.find_element_by_description(parameters["description"])
-        else: return {"status": "error", "message": f"Unknown action type: {action_type}"}
+        return await browser_action(browser, parameters)
     except Exception as e:
         logger.error(f"MCP: Action '{action_type}' failed: {e}")
         return {"status": "error", "message": str(e)}
@@ -452,11 +685,38 @@ async def test_login_prompt(headless: bool = False):
     logger.info(f"Running test login prompt: {test_goal}")
     return await mcp_loop(test_goal, headless=headless)
 
+async def ainput(prompt: str) -> str:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def settle(set_result, value):
+        if not future.done():
+            set_result(value)
+    
+    def read_line():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(settle, future.set_result, line)
+    
+    threading.Thread(target=read_line, daemon=True).start()
+    return await future
+
+async def warm_browser(headless: bool):
+    try:
+        await browser_pool.warm_up(headless)
+    except Exception as e:
+        logger.warning(f"Browser warm-up failed: {e}")
+
 async def main_cli():
     print("WebMCP CLI - Type your command/goal or 'exit'. 'test_login' for Instagram test.")
     while True:
         try:
-            goal = input("\nGoal or 'test_login'/'exit'> ").strip()
+            warm_up_task = asyncio.create_task(warm_browser(headless=False))
+            goal = (await ainput("\nGoal or 'test_login'/'exit'> ")).strip()
+            await warm_up_task
             if goal.lower() == 'exit': 
                 print("Exiting...")
                 break
@@ -484,6 +744,13 @@ async def main_cli():
             logger.error(f"CLI Error: {e}")
             print(f"An error occurred: {e}")
 
+async def run_cli():
+    try:
+        await main_cli()
+    finally:
+        await browser_pool.shutdown()
+        await aclose_openrouter_client()
+
 if __name__ == "__main__":
     print("✅ WebMCP CLI initialized successfully!")
-    asyncio.run(main_cli())
\ No newline at end of file
+    asyncio.run(run_cli())
\ No newline at end of file
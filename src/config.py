@@ -1,28 +1,59 @@
+import logging
 import os
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 load_dotenv()
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-GITHUB_MODEL_NAME = os.getenv("GITHUB_MODEL_NAME", "microsoft/Phi-3.5-mini-instruct")
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-DEFAULT_HEADLESS = os.getenv("DEFAULT_HEADLESS", "False").lower() == "true"
-DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", "30000"))
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
-RETRY_DELAY = int(os.getenv("RETRY_DELAY", "1"))
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Config:
+    openrouter_api_key: str | None = field(repr=False)
+    github_token: str | None = field(repr=False)
+    github_model_name: str
+    log_level: str
+    default_headless: bool
+    default_timeout: int
+    openai_api_key: str | None = field(repr=False)
+    anthropic_api_key: str | None = field(repr=False)
+    max_retries: int
+    retry_delay: float
+    browser_pool_size: int
+    browser_pool_recycle_after: int
+    llm_cache_on_disk: bool
+    llm_semantic_cache: bool
+
+    @classmethod
+    def from_env(cls, env=os.environ) -> "Config":
+        return cls(
+            openrouter_api_key=env.get("OPENROUTER_API_KEY"),
+            github_token=env.get("GITHUB_TOKEN"),
+            github_model_name=env.get("GITHUB_MODEL_NAME", "microsoft/Phi-3.5-mini-instruct"),
+            log_level=env.get("LOG_LEVEL", "INFO"),
+            default_headless=env.get("DEFAULT_HEADLESS", "False").lower() == "true",
+            default_timeout=int(env.get("DEFAULT_TIMEOUT", "30000")),
+            openai_api_key=env.get("OPENAI_API_KEY"),
+            anthropic_api_key=env.get("ANTHROPIC_API_KEY"),
+            max_retries=int(env.get("MAX_RETRIES", "3")),
+            retry_delay=float(env.get("RETRY_DELAY", "1")),
+            browser_pool_size=int(env.get("BROWSER_POOL_SIZE", "4")),
+            browser_pool_recycle_after=int(env.get("BROWSER_POOL_RECYCLE_AFTER", "100")),
+            llm_cache_on_disk=env.get("WEBMCP_LLM_CACHE") == "1",
+            llm_semantic_cache=env.get("WEBMCP_LLM_SEMANTIC_CACHE") == "1",
+        )
+
+CONFIG = Config.from_env()
 
 def validate_config():
-    if not OPENROUTER_API_KEY:
+    if not CONFIG.openrouter_api_key:
         raise ValueError("OPENROUTER_API_KEY is required but not found in environment variables. Please set it in your .env file.")
     
-    print(f"✅ Configuration loaded:")
-    print(f"   • OpenRouter API Key: {'Set (masked)' if OPENROUTER_API_KEY else 'Not set - REQUIRED'}")
-    print(f"   • Model: Google Gemini-2.0-Flash-Exp (Free) - via OpenRouter")
-    print(f"   • Log Level: {LOG_LEVEL}")
-    print(f"   • Browser Headless: {DEFAULT_HEADLESS}")
+    logger.info(
+        "✅ Configuration loaded: OpenRouter API Key set (masked), Log Level %s, Browser Headless %s",
+        CONFIG.log_level, CONFIG.default_headless,
+    )
 
 if __name__ == "__main__":
-    validate_config()
\ No newline at end of file
+    logging.basicConfig(level=CONFIG.log_level)
+    validate_config()
@@ -1,3 +1,3 @@
-from .client import get_llm_response
+from .client import get_llm_response, stream_llm_response
 
-__all__ = ['get_llm_response']
\ No newline at end of file
+__all__ = ['get_llm_response', 'stream_llm_response']
\ No newline at end of file
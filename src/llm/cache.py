@@ -0,0 +1,133 @@
+import difflib
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from ..config import CONFIG
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_SIZE = 128
+LLM_CACHE_TTL = 86400
+LLM_CACHE_DIR = Path("~/.webmcp/llm_cache").expanduser()
+CACHEABLE_MAX_TEMPERATURE = 0.2
+SEMANTIC_CACHE_SIZE = 64
+SEMANTIC_SIMILARITY_THRESHOLD = 0.97
+
+class LLMCache:
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, directory: Path = None, expire_seconds: int = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.expire_seconds = expire_seconds
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        fields = {"model": model, "sys": system_prompt, "user": user_prompt, "temp": temperature}
+        if orjson:
+            payload = orjson.dumps(fields, option=orjson.OPT_SORT_KEYS)
+        else:
+            payload = json.dumps(fields, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None and self.directory is not None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._entries.pop(key, None)
+            if self.directory is not None:
+                self._delete_disk(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        entry = (time.time() + self.expire_seconds, value)
+        self._remember(key, entry)
+        if self.directory is not None:
+            self._write_disk(key, entry)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str):
+        try:
+            data = json.loads((self.directory / f"{key}.json").read_text(encoding='utf-8'))
+            return data["expires_at"], data["value"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug("Ignoring unreadable LLM cache entry %s: %s", key, e)
+            return None
+
+    def _delete_disk(self, key: str):
+        try:
+            (self.directory / f"{key}.json").unlink(missing_ok=True)
+        except OSError as e:
+            logger.debug("Could not delete expired LLM cache entry %s: %s", key, e)
+
+    def _write_disk(self, key: str, entry: tuple):
+        expires_at, value = entry
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.directory / f"{key}.{os.getpid()}.tmp"
+            tmp_path.write_text(json.dumps({"expires_at": expires_at, "value": value}), encoding='utf-8')
+            os.replace(tmp_path, self.directory / f"{key}.json")
+        except OSError as e:
+            logger.warning("Could not write LLM cache entry: %s", e)
+
+class SemanticCache:
+    def __init__(self, max_entries: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._entries = deque(maxlen=max_entries)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    def get(self, system_prompt: str, user_prompt: str, temperature: float):
+        prompt = self._normalize(user_prompt)
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(prompt)
+        best_score, best_value = 0.0, None
+        for entry_system, entry_temperature, entry_prompt, value in self._entries:
+            if entry_system != system_prompt or entry_temperature != temperature:
+                continue
+            matcher.set_seq1(entry_prompt)
+            if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+                continue
+            score = matcher.ratio()
+            if score >= self.threshold and score > best_score:
+                best_score, best_value = score, value
+        if best_value is not None:
+            logger.debug("Semantic cache hit (similarity %.3f)", best_score)
+        return best_value
+
+    def set(self, system_prompt: str, user_prompt: str, temperature: float, value: str):
+        self._entries.append((system_prompt, temperature, self._normalize(user_prompt), value))
+
+    def clear(self):
+        self._entries.clear()
+
+llm_cache = LLMCache(directory=LLM_CACHE_DIR if CONFIG.llm_cache_on_disk else None)
+semantic_cache = SemanticCache() if CONFIG.llm_semantic_cache else None
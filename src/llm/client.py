@@ -1,140 +1,377 @@
-import os
+import asyncio
+import functools
+import json
 import logging
+import random
 import re
 import time
-from openai import OpenAI
+from collections import defaultdict, deque
+from types import MappingProxyType
+import httpx
+from openai import AsyncOpenAI, AuthenticationError, RateLimitError
+from ..config import CONFIG
+from .cache import CACHEABLE_MAX_TEMPERATURE, LLMCache, llm_cache, semantic_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+JSON_FENCE_RE = re.compile(r'```(?:json)?\s*')
 
-last_request_time = 0
-request_count = 0
+MAX_RETRIES = CONFIG.max_retries
+RETRY_BASE_DELAY = CONFIG.retry_delay
+RETRY_MAX_DELAY = 60.0
+HEDGE_DELAY = 2.0
+CACHE_CONTROL_PROVIDERS = ("anthropic/", "google/")
+HEALTH_WINDOW = 60.0
+HEALTH_FAILURE_RATE = 0.5
+HALF_OPEN_AFTER = 30.0
+HEALTH_MIN_SAMPLES = 3
+RATE_LIMIT_WINDOW = 60.0
+PLANNING_MAX_TOKENS = 512
+FINAL_ANSWER_MAX_TOKENS = 2000
+PLANNING_STOP = ("\n```\n",)
 
 def clean_json_response(response_text: str) -> str:
     if not response_text:
         return response_text
     
-    response_text = re.sub(r'```json\s*', '', response_text)
-    response_text = re.sub(r'```\s*', '', response_text)
-    response_text = response_text.strip()
-    
-    return response_text
-
-def smart_rate_limit():
-    global last_request_time, request_count
-    
-    current_time = time.time()
-    
-    if current_time - last_request_time > 60:
-        request_count = 0
-        last_request_time = current_time
-    
-    if request_count >= 3: 
-        time_elapsed = current_time - last_request_time
-        if time_elapsed < 60:
-            min_wait = max(16, 60 - time_elapsed + 1)
-            logger.info(f"Smart rate limit: waiting {min_wait:.1f} seconds...")
-            time.sleep(min_wait)
-            request_count = 0
-            last_request_time = time.time()
-
-def get_llm_response(system_prompt: str, user_prompt: str, is_final_answer_generation: bool = False) -> str:
-    
-    model_options = [
-        {
-            "name": "google/gemini-2.0-flash-exp:free",
-            "rate_limit": 4,
-            "use_rate_limiting": True, 
-            "description": "Gemini 2.0 Flash (PRIMARY - User Requested)",
-            "priority": 1
-        },
-        {
-            "name": "mistralai/mistral-7b-instruct:free",
-            "rate_limit": 20,
-            "use_rate_limiting": False, 
-            "description": "Mistral 7B Instruct (SECONDARY - reliable)",
-            "priority": 2
-        },
-        {
-            "name": "meta-llama/llama-3.2-3b-instruct:free", 
-            "rate_limit": 20,
-            "use_rate_limiting": False,
-            "description": "Meta Llama 3.2 (TERTIARY - good general, 20/min)",
-            "priority": 3
-        },
-        {
-            "name": "deepseek/deepseek-r1-0528-qwen3-8b:free",
-            "rate_limit": 20, 
-            "use_rate_limiting": False, 
-            "description": "DeepSeek R1 Qwen3 8B (FALLBACK - high rate limit, 20/min)",
-            "priority": 4
-        }
+    if '```' not in response_text:
+        return response_text.strip()
+    
+    return JSON_FENCE_RE.sub('', response_text).strip()
+
+def clean_llm_content(content: str, is_final_answer_generation: bool) -> str:
+    return content.strip() if is_final_answer_generation else clean_json_response(content)
+
+MODEL_OPTIONS = tuple(MappingProxyType(model_config) for model_config in (
+    {
+        "name": "google/gemini-2.0-flash-exp:free",
+        "rate_limit": 4,
+        "use_rate_limiting": True, 
+        "description": "Gemini 2.0 Flash (PRIMARY - User Requested)",
+        "priority": 1
+    },
+    {
+        "name": "mistralai/mistral-7b-instruct:free",
+        "rate_limit": 20,
+        "use_rate_limiting": False, 
+        "description": "Mistral 7B Instruct (SECONDARY - reliable)",
+        "priority": 2
+    },
+    {
+        "name": "meta-llama/llama-3.2-3b-instruct:free", 
+        "rate_limit": 20,
+        "use_rate_limiting": False,
+        "description": "Meta Llama 3.2 (TERTIARY - good general, 20/min)",
+        "priority": 3
+    },
+    {
+        "name": "deepseek/deepseek-r1-0528-qwen3-8b:free",
+        "rate_limit": 20, 
+        "use_rate_limiting": False, 
+        "description": "DeepSeek R1 Qwen3 8B (FALLBACK - high rate limit, 20/min)",
+        "priority": 4
+    }
+))
+MODEL_RATE_LIMITS = {
+    model_config["name"]: model_config["rate_limit"]
+    for model_config in MODEL_OPTIONS if model_config["use_rate_limiting"]
+}
+
+@functools.lru_cache(maxsize=1)
+def get_openrouter_client() -> AsyncOpenAI:
+    return AsyncOpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=CONFIG.openrouter_api_key,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=30.0,
+        ),
+    )
+
+async def aclose_openrouter_client():
+    if get_openrouter_client.cache_info().currsize:
+        await get_openrouter_client().close()
+        get_openrouter_client.cache_clear()
+
+@functools.lru_cache(maxsize=16)
+def system_message(system_prompt: str, cache_control: bool) -> dict:
+    if not cache_control:
+        return {"role": "system", "content": system_prompt}
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    }
+
+def build_messages(model_name: str, system_prompt: str, user_prompt: str) -> list:
+    return [
+        system_message(system_prompt, model_name.startswith(CACHE_CONTROL_PROVIDERS)),
+        {"role": "user", "content": user_prompt}
     ]
-        
-    for model_config in model_options:
-        model_name = model_config["name"]
-        
+
+_model_health = defaultdict(deque)
+
+def record_model_result(model_name: str, ok: bool):
+    _model_health[model_name].append((time.monotonic(), ok))
+
+def model_available(model_name: str) -> bool:
+    history = _model_health[model_name]
+    now = time.monotonic()
+    while history and now - history[0][0] > HEALTH_WINDOW:
+        history.popleft()
+    if len(history) < HEALTH_MIN_SAMPLES:
+        return True
+    failures = [timestamp for timestamp, ok in history if not ok]
+    if len(failures) / len(history) <= HEALTH_FAILURE_RATE:
+        return True
+    return now - failures[-1] >= HALF_OPEN_AFTER
+
+_request_times = defaultdict(deque)
+
+async def wait_for_rate_limit(model_name: str):
+    limit = MODEL_RATE_LIMITS.get(model_name)
+    if limit is None:
+        return
+    recent = _request_times[model_name]
+    while True:
+        now = time.monotonic()
+        while recent and now - recent[0] >= RATE_LIMIT_WINDOW:
+            recent.popleft()
+        if len(recent) < limit:
+            recent.append(now)
+            return
+        delay = RATE_LIMIT_WINDOW - (now - recent[0])
+        logger.info("⏳ %s is at %d requests/min, waiting %.1fs", model_name, limit, delay)
+        await asyncio.sleep(delay)
+
+def completion_limits(is_final_answer_generation: bool) -> dict:
+    if is_final_answer_generation:
+        return {"max_tokens": FINAL_ANSWER_MAX_TOKENS}
+    return {"max_tokens": PLANNING_MAX_TOKENS, "stop": list(PLANNING_STOP)}
+
+def retry_after_seconds(error: RateLimitError):
+    retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return None
+
+async def create_completion(model_name: str, messages: list, **options):
+    client = get_openrouter_client()
+    for attempt in range(MAX_RETRIES + 1):
+        await wait_for_rate_limit(model_name)
         try:
-            if model_config["use_rate_limiting"]:
-                smart_rate_limit()
-            
-            logger.info(f"Using OpenRouter model: {model_name} (Priority {model_config['priority']}) {'for final answer' if is_final_answer_generation else ''}")
-            
-            client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=OPENROUTER_API_KEY,
-            )
-            
-            response = client.chat.completions.create(
+            return await client.chat.completions.create(
                 extra_headers={
                     "HTTP-Referer": "https://webmcp-automation.local",
                     "X-Title": "WebMCP Browser Automation",
                 },
                 extra_body={},
                 model=model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2 if is_final_answer_generation else 0.1, 
-                max_tokens=2000,
+                messages=messages,
+                **options,
             )
-            
-            if model_config["use_rate_limiting"]:
-                global request_count
-                request_count += 1
-            
-            if response.choices and len(response.choices) > 0:
-                content = response.choices[0].message.content
-                if content:
-                    cleaned_content = content.strip() if is_final_answer_generation else clean_json_response(content)
-                    logger.info(f"✅ Success from {model_name}")
-                    return cleaned_content
-            
-            logger.warning(f"Empty response from {model_name}, trying next model")
-            continue
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "rate_limit" in error_msg.lower():
-                logger.warning(f"🔄 Rate limit for {model_name}, switching to next model")
-                continue
-            elif "401" in error_msg or "Unauthorized" in error_msg:
-                logger.error(f"❌ Auth failed for {model_name}")
-                continue
-            elif "insufficient_quota" in error_msg.lower():
-                logger.warning(f"💰 Quota exhausted for {model_name}, trying next model")
-                continue
-            else:
-                logger.error(f"❌ Error with {model_name}: {error_msg}")
+        except RateLimitError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            elif delay > RETRY_MAX_DELAY:
+                raise
+            logger.warning("🔄 Rate limit for %s, retrying in %.1fs (%d/%d)", model_name, delay, attempt + 1, MAX_RETRIES)
+            await asyncio.sleep(delay)
+
+def cached_llm_response(system_prompt: str, user_prompt: str, temperature: float, is_final_answer_generation: bool = False):
+    if temperature > CACHEABLE_MAX_TEMPERATURE:
+        return None
+    for model_config in MODEL_OPTIONS:
+        cached = llm_cache.get(LLMCache.key(model_config["name"], system_prompt, user_prompt, temperature))
+        if cached is not None:
+            logger.debug("♻️ Cached response from %s", model_config["name"])
+            return cached
+    if semantic_cache is not None and is_final_answer_generation:
+        cached = semantic_cache.get(system_prompt, user_prompt, temperature)
+        if cached is not None:
+            logger.debug("♻️ Cached response for a near-identical prompt")
+            return cached
+    return None
+
+def store_llm_response(model_name: str, system_prompt: str, user_prompt: str, temperature: float, content: str, is_final_answer_generation: bool = False):
+    if temperature <= CACHEABLE_MAX_TEMPERATURE:
+        llm_cache.set(LLMCache.key(model_name, system_prompt, user_prompt, temperature), content)
+        if semantic_cache is not None and is_final_answer_generation:
+            semantic_cache.set(system_prompt, user_prompt, temperature, content)
+
+async def first_successful_model(attempt, discard=None):
+    candidates = [model_config for model_config in MODEL_OPTIONS if model_available(model_config["name"])]
+    if len(candidates) < len(MODEL_OPTIONS):
+        skipped = [model_config["name"] for model_config in MODEL_OPTIONS if model_config not in candidates]
+        logger.info("⚡ Circuit open, skipping: %s", ", ".join(skipped))
+    candidates = candidates or list(MODEL_OPTIONS)
+    pending = {}
+    next_index = 0
+    
+    def launch_next() -> bool:
+        nonlocal next_index
+        if next_index >= len(candidates):
+            return False
+        model_config = candidates[next_index]
+        next_index += 1
+        pending[asyncio.create_task(attempt(model_config))] = model_config["name"]
+        return True
+    
+    launch_next()
+    winner = None
+    try:
+        while pending and winner is None:
+            has_fallback = next_index < len(candidates)
+            done, _ = await asyncio.wait(pending, timeout=HEDGE_DELAY if has_fallback else None, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info("⏱️ No response within %.0fs, hedging with the next model", HEDGE_DELAY)
+                launch_next()
                 continue
+            for task in done:
+                model_name = pending.pop(task)
+                try:
+                    result = task.result()
+                except AuthenticationError as e:
+                    logger.error("❌ Auth failed for %s: %s", model_name, e)
+                    return None, None
+                except Exception as e:
+                    log_model_error(model_name, e)
+                    record_model_result(model_name, False)
+                    launch_next()
+                    continue
+                record_model_result(model_name, result is not None)
+                if result is None:
+                    logger.warning("Empty response from %s, trying next model", model_name)
+                    launch_next()
+                elif winner is None:
+                    winner = (model_name, result)
+                elif discard is not None:
+                    await discard(result)
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    return winner if winner is not None else (None, None)
+
+async def get_llm_response(system_prompt: str, user_prompt: str, is_final_answer_generation: bool = False, stream: bool = False) -> str:
+    temperature = 0.2 if is_final_answer_generation else 0.1
+    if stream:
+        streamed_parts = []
+        async for content in stream_llm_response(system_prompt, user_prompt, temperature, is_final_answer_generation):
+            print(content, end="", flush=True)
+            streamed_parts.append(content)
+        if not streamed_parts:
+            return None
+        print()
+        return clean_llm_content(''.join(streamed_parts), is_final_answer_generation)
+    
+    cached = cached_llm_response(system_prompt, user_prompt, temperature, is_final_answer_generation)
+    if cached is not None:
+        return cached
+    
+    async def request_model(model_config):
+        logger.info("Using OpenRouter model: %s (Priority %d)%s", model_config["name"], model_config["priority"], " for final answer" if is_final_answer_generation else "")
+        response = await create_completion(
+            model_config["name"],
+            build_messages(model_config["name"], system_prompt, user_prompt),
+            temperature=temperature, 
+            **completion_limits(is_final_answer_generation),
+        )
+        if response.choices and response.choices[0].message.content:
+            return clean_llm_content(response.choices[0].message.content, is_final_answer_generation)
+        return None
+    
+    model_name, cleaned_content = await first_successful_model(request_model)
+    if cleaned_content is None:
+        logger.error("❌ All OpenRouter models failed!")
+        return None
+    
+    logger.debug("✅ Success from %s", model_name)
+    store_llm_response(model_name, system_prompt, user_prompt, temperature, cleaned_content, is_final_answer_generation)
+    return cleaned_content
+
+async def stream_llm_response(system_prompt: str, user_prompt: str, temperature: float = 0.1, is_final_answer_generation: bool = False):
+    cached = cached_llm_response(system_prompt, user_prompt, temperature, is_final_answer_generation)
+    if cached is not None:
+        yield cached
+        return
     
-    logger.error("❌ All OpenRouter models failed!")
+    async def open_stream(model_config):
+        logger.info("Streaming from OpenRouter model: %s (Priority %d)", model_config["name"], model_config["priority"])
+        stream = await create_completion(
+            model_config["name"],
+            build_messages(model_config["name"], system_prompt, user_prompt),
+            temperature=temperature,
+            stream=True,
+            **completion_limits(is_final_answer_generation),
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    return stream, chunk.choices[0].delta.content
+        except BaseException:
+            await stream.close()
+            raise
+        await stream.close()
+        return None
+    
+    async def close_stream(opened):
+        await opened[0].close()
+    
+    model_name, opened = await first_successful_model(open_stream, discard=close_stream)
+    if opened is None:
+        logger.error("❌ All OpenRouter models failed!")
+        return
+    
+    stream, first_content = opened
+    received_chunks = [first_content]
+    try:
+        yield first_content
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                received_chunks.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+    
+    logger.debug("✅ Streamed response from %s", model_name)
+    store_llm_response(model_name, system_prompt, user_prompt, temperature, clean_llm_content(''.join(received_chunks), is_final_answer_generation), is_final_answer_generation)
+
+def log_model_error(model_name: str, error: Exception):
+    error_msg = str(error)
+    if "429" in error_msg or "rate_limit" in error_msg.lower():
+        logger.warning("🔄 Rate limit for %s, switching to next model", model_name)
+    elif "401" in error_msg or "Unauthorized" in error_msg:
+        logger.error("❌ Auth failed for %s", model_name)
+    elif "insufficient_quota" in error_msg.lower():
+        logger.warning("💰 Quota exhausted for %s, trying next model", model_name)
+    else:
+        logger.error("❌ Error with %s: %s", model_name, error_msg)
+
+def validate_mcp_actions(parsed):
+    if not isinstance(parsed, list) or not parsed:
+        return "expected a non-empty JSON array"
+    for index, action in enumerate(parsed):
+        if not isinstance(action, dict):
+            return f"action {index} is not an object"
+        if not isinstance(action.get("action_type"), str):
+            return f"action {index} has no string 'action_type'"
+        if not isinstance(action.get("parameters"), dict):
+            return f"action {index} has no 'parameters' object"
     return None
 
-def test_mcp_models():
-    if not OPENROUTER_API_KEY:
+async def test_mcp_models():
+    if not CONFIG.openrouter_api_key:
         print("❌ OPENROUTER_API_KEY not found")
         return False
     
@@ -158,21 +395,29 @@ No other text allowed."""
     success_count = 0
     total_time = time.time()
     
-    for i in range(4):
-        print(f"\n🔄 MCP Test {i+1}/4:")
+    async def timed_request():
         start_time = time.time()
-        result = get_llm_response(test_system_prompt, test_user_prompt)
-        request_time = time.time() - start_time
+        result = await get_llm_response(test_system_prompt, test_user_prompt)
+        return result, time.time() - start_time
+    
+    outcomes = await asyncio.gather(*(timed_request() for _ in range(4)), return_exceptions=True)
+    
+    for i, outcome in enumerate(outcomes):
+        print(f"\n🔄 MCP Test {i+1}/4:")
+        if isinstance(outcome, Exception):
+            print(f"❌ Request failed: {outcome}")
+            continue
+        result, request_time = outcome
         
         if result:
             try:
-                import json
-                parsed = json.loads(result)
-                if isinstance(parsed, list) and len(parsed) > 0 and "action_type" in parsed[0] and "parameters" in parsed[0]:
+                parsed = orjson.loads(result) if orjson else json.loads(result)
+                validation_error = validate_mcp_actions(parsed)
+                if validation_error is None:
                     print(f"✅ MCP Success in {request_time:.1f}s: Valid MCP format")
                     success_count += 1
                 else:
-                    print(f"⚠️  Valid JSON but wrong MCP format: {result[:70]}...")
+                    print(f"⚠️  Valid JSON but wrong MCP format ({validation_error}): {result[:70]}...")
             except json.JSONDecodeError:
                 print(f"❌ Invalid JSON: {result[:70]}...")
         else:
@@ -192,7 +437,7 @@ No other text allowed."""
 
 if __name__ == "__main__":
     print("🚀 WebMCP LLM Client Test (Gemini Flash 2.0 Primary)")
-    success = test_mcp_models()
+    success = asyncio.run(test_mcp_models())
     if success:
         print("\n🎬 Ready for reliable MCP demo video with Gemini Flash 2.0!")
     else: